@@ -0,0 +1,244 @@
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from knightstour import KnightsTour
+
+
+def parse_size(text):
+    '''
+    Parse a board size given as ROWSxCOLS
+    '''
+    rows, _, cols = text.lower().partition('x')
+    return int(rows), int(cols)
+
+
+def start_squares(rows, cols, starts='corner', seed=0):
+    '''
+    The start squares to benchmark on a board: 'corner' is the top-left
+    square only, 'all' is every square, and an int n is a sample of n
+    squares drawn with the given seed
+    '''
+    squares = [(i, j) for i in range(rows) for j in range(cols)]
+    if starts == 'corner':
+        return squares[:1]
+    if starts == 'all':
+        return squares
+    count = int(starts)
+    if count >= len(squares):
+        return squares
+    return sorted(random.Random(seed).sample(squares, count))
+
+
+def environment():
+    '''
+    Metadata about the machine and the code a benchmark ran on
+    '''
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'python': sys.version.split()[0],
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count(),
+        'commit': commit,
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+    }
+
+
+def _count_nodes(kt):
+    '''
+    The number of nodes (placements) the search of kt expanded, or None
+    when its trace does not record them
+    '''
+    if kt.stats is not None:
+        return kt.stats.nodes
+    moves = kt.getMoves()
+    if kt.trace == 'count':
+        return moves.placements - 1
+    if kt.trace == 'off':
+        return None
+    return sum(1 for move in moves if move[2] != -1) - 1
+
+
+def run_case(rows, cols, start_row=0, start_col=0, repeats=5, warmup=1,
+             **options):
+    '''
+    Time one (size, start square, solver options) case: warmup untimed
+    solves, then repeats timed ones with perf_counter_ns and the garbage
+    collector off. Returns the case with its raw times in nanoseconds,
+    their median and interquartile range, the nodes expanded, the nodes
+    per second at the median time and the nodes pruned
+
+    options: passed on to KnightsTour (default: trace='count', so that the
+        trace costs no memory and still counts the nodes)
+    '''
+    options.setdefault('trace', 'count')
+    for _ in range(warmup):
+        KnightsTour(rows, cols, start_row, start_col, **options).solve()
+
+    times = []
+    gc_enabled = gc.isenabled()
+    for _ in range(repeats):
+        kt = KnightsTour(rows, cols, start_row, start_col, **options)
+        gc.collect()
+        gc.disable()
+        try:
+            start_time = time.perf_counter_ns()
+            kt.solve()
+            elapsed = time.perf_counter_ns() - start_time
+        finally:
+            if gc_enabled:
+                gc.enable()
+        times.append(elapsed)
+
+    median = statistics.median(times)
+    if len(times) > 1:
+        q1, _, q3 = statistics.quantiles(times, n=4)
+    else:
+        q1 = q3 = times[0]
+    nodes = _count_nodes(kt)
+    return {
+        'rows': rows,
+        'cols': cols,
+        'start_row': start_row,
+        'start_col': start_col,
+        'options': {key: value for key, value in sorted(options.items())},
+        'solved': kt.solutionFound,
+        'times_ns': times,
+        'median_ns': median,
+        'iqr_ns': q3 - q1,
+        'nodes': nodes,
+        'nodes_per_sec': nodes and nodes / (median / 1e9 or 1e-9),
+        'pruned_nodes': kt.prunedNodes,
+    }
+
+
+def run_suite(board_sizes, strategies=('backtrack',), starts='corner',
+              repeats=5, warmup=1, seed=0, progress=print, **options):
+    '''
+    Run every (size, start square, strategy) case, the start squares of
+    each size being picked by start_squares(). Returns the environment
+    and the results, ready to be written as JSON
+    '''
+    results = []
+    for rows, cols in board_sizes:
+        for start_row, start_col in start_squares(rows, cols, starts, seed):
+            for strategy in strategies:
+                result = run_case(rows, cols, start_row, start_col,
+                                  repeats, warmup, strategy=strategy,
+                                  **options)
+                results.append(result)
+                if progress:
+                    progress(format_result(result))
+    return {'environment': environment(), 'results': results}
+
+
+def case_key(result):
+    '''
+    The identity of a case, to match the results of two runs
+    '''
+    return (result['rows'], result['cols'], result['start_row'],
+            result['start_col'], json.dumps(result['options'],
+                                            sort_keys=True))
+
+
+def format_result(result):
+    '''
+    A one line summary of a case
+    '''
+    rate = result['nodes_per_sec']
+    return (f"{result['rows']}x{result['cols']} "
+            f"({result['start_row']}, {result['start_col']}) "
+            f"{result['options'].get('strategy', 'backtrack')}: "
+            f"median {result['median_ns'] / 1e6:.3f} ms, "
+            f"IQR {result['iqr_ns'] / 1e6:.3f} ms"
+            + (f", {rate:,.0f} nodes/s" if rate else ''))
+
+
+def compare(baseline, current, threshold=0.1):
+    '''
+    Compare two runs case by case. A case regressed when its median time
+    grew by more than threshold (a fraction) and by more than the sum of
+    the two interquartile ranges, so that noise alone is not flagged.
+    Returns (regressions, improvements) as lists of
+    (key, baseline median, current median) tuples
+    '''
+    before = {case_key(result): result for result in baseline['results']}
+    regressions, improvements = [], []
+    for result in current['results']:
+        key = case_key(result)
+        if key not in before:
+            continue
+        old, new = before[key]['median_ns'], result['median_ns']
+        noise = before[key]['iqr_ns'] + result['iqr_ns']
+        if new > old * (1 + threshold) and new - old > noise:
+            regressions.append((key, old, new))
+        elif new < old * (1 - threshold) and old - new > noise:
+            improvements.append((key, old, new))
+    return regressions, improvements
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Benchmark the knight's tour solver")
+    parser.add_argument('--sizes', nargs='+', type=parse_size,
+                        default=[(3, 4), (4, 5), (5, 5), (6, 5), (6, 6)],
+                        help='board sizes as ROWSxCOLS')
+    parser.add_argument('--strategies', nargs='+', default=['backtrack'],
+                        choices=KnightsTour.STRATEGIES)
+    parser.add_argument('--engine', default='list',
+                        choices=KnightsTour.ENGINES)
+    parser.add_argument('--prune', action='store_true')
+    parser.add_argument('--starts', default='corner',
+                        help="'corner', 'all' or a number of start squares "
+                             "to sample")
+    parser.add_argument('--seed', type=int, default=0,
+                        help='seed of the start square sample')
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--warmup', type=int, default=1)
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--compare', metavar='BASELINE',
+                        help='a JSON file of earlier results to compare with')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='the slowdown (a fraction) that counts as a '
+                             'regression')
+    args = parser.parse_args(argv)
+
+    report = run_suite(args.sizes, args.strategies, args.starts,
+                       args.repeats, args.warmup, args.seed,
+                       engine=args.engine, prune=args.prune)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions, improvements = compare(baseline, report, args.threshold)
+        for title, cases in (('Regressions', regressions),
+                             ('Improvements', improvements)):
+            print(f'{title}: {len(cases)}')
+            for key, old, new in cases:
+                rows, cols, start_row, start_col, options = key
+                print(f'    {rows}x{cols} ({start_row}, {start_col}) '
+                      f'{options}: {old / 1e6:.3f} ms -> {new / 1e6:.3f} ms')
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,188 @@
+import random
+import signal
+import time
+from array import array
+from functools import lru_cache
+from multiprocessing import Pool
+from knightstour_trace import (BinaryTrace, CountTrace, InstrumentedTrace,
+                               NullTrace, PackedTrace)
+
+
+# The moves of a knight, in the order the search tries them by default
+KNIGHT_MOVES = (
+    (2, 1), (1, 2), (-1, 2), (-2, 1),
+    (-2, -1), (-1, -2), (1, -2), (2, -1)
+)
+
+
+@lru_cache(maxsize=16)
+def neighbourTable(rows, cols, possibleMoves):
+    '''
+    The in-bounds knight moves of a rows x cols board, built once per board
+    size and move ordering and shared by every KnightsTour of that shape
+
+    Cells are identified by the flat id row * cols + col. Entry i of the
+    result is a tuple of the cells reachable from cell i, in the order of
+    possibleMoves (a tuple of (row, col) offsets)
+    '''
+    return tuple(
+        tuple(
+            (i + moveRow) * cols + j + moveCol
+            for moveRow, moveCol in possibleMoves
+            if 0 <= i + moveRow < rows and 0 <= j + moveCol < cols
+        )
+        for i in range(rows)
+        for j in range(cols)
+    )
+
+
+@lru_cache(maxsize=16)
+def neighbourMasks(rows, cols, possibleMoves):
+    '''
+    The neighbour table of a rows x cols board as bitmasks: bit j of entry i
+    is set when cell j is a knight's move away from cell i
+    '''
+    return tuple(
+        sum(1 << newCell for newCell in candidates)
+        for candidates in neighbourTable(rows, cols, possibleMoves)
+    )
+
+
+def updateDegrees(cells, degrees, neighbours, currCell, delta,
+                  lowCounts=None):
+    '''
+    Adjust the onward move count of every neighbour of currCell when it
+    gets visited (-1) or released (+1). cells must already reflect the
+    change. lowCounts, when given, holds the number of unvisited cells
+    with zero and with one onward move
+    '''
+    if lowCounts is None:
+        for newCell in neighbours[currCell]:
+            degrees[newCell] += delta
+        return
+    if degrees[currCell] < 2:
+        lowCounts[degrees[currCell]] += delta
+    for newCell in neighbours[currCell]:
+        degree = degrees[newCell]
+        degrees[newCell] = degree + delta
+        if cells[newCell] == -1:
+            if degree < 2:
+                lowCounts[degree] -= 1
+            if degree + delta < 2:
+                lowCounts[degree + delta] += 1
+
+
+def stranded(cells, degrees, neighbours, currCell, lowCounts):
+    '''
+    Whether the unvisited cells can no longer all be toured from currCell:
+    every one of them needs a way in and a way out, where currCell counts
+    as a way in, except for the one the tour ends on. lowCounts is kept by
+    updateDegrees()
+    '''
+    zeros, ones = lowCounts
+    for newCell in neighbours[currCell]:
+        if cells[newCell] == -1:
+            if degrees[newCell] == 0:
+                zeros -= 1
+                ones += 1
+            elif degrees[newCell] == 1:
+                ones -= 1
+    return zeros > 0 or ones > 1
+
+
+def closedTourExists(rows, cols):
+    '''
+    Schwenk's theorem: a rows x cols board has a closed tour unless both
+    sides are odd, the short side is 1, 2 or 4, or the board is 3x4, 3x6
+    or 3x8
+    '''
+    short, long = sorted((rows, cols))
+    return not (short % 2 and long % 2 or short in (1, 2, 4)
+                or short == 3 and long in (4, 6, 8))
+
+
+def openTourExists(rows, cols):
+    '''
+    Conrad et al.: a rows x cols board (other than 1x1) has an open tour
+    unless the short side is 1 or 2, the board is 3x3, 3x5 or 3x6, or 4x4
+    '''
+    short, long = sorted((rows, cols))
+    if rows * cols == 1:
+        return True
+    return not (short in (1, 2) or short == 3 and long in (3, 5, 6)
+                or short == long == 4)
+
+
+@lru_cache(maxsize=16)
+def cellCoords(rows, cols):
+    '''
+    The (row, col) coordinates of every flat cell id of a rows x cols board
+    '''
+    return tuple((i, j) for i in range(rows) for j in range(cols))
+
+
+def luby(i):
+    '''
+    The i-th term (from 1) of the Luby sequence 1, 1, 2, 1, 1, 2, 4, 1, ...
+    used to grow the node budgets of randomized restarts
+    '''
+    while True:
+        k = 1
+        while (1 << k) - 1 < i:
+            k += 1
+        if (1 << k) - 1 == i:
+            return 1 << (k - 1)
+        i -= (1 << (k - 1)) - 1
+
+
+def portfolioOrderings(possibleMoves, count):
+    '''
+    count move orderings for a portfolio of searches: possibleMoves itself,
+    then its rotations, then seeded shuffles of it
+    '''
+    possibleMoves = list(possibleMoves)
+    orderings = []
+    for variant in range(count):
+        if variant < len(possibleMoves):
+            ordering = possibleMoves[variant:] + possibleMoves[:variant]
+        else:
+            ordering = possibleMoves[:]
+            random.Random(variant).shuffle(ordering)
+        orderings.append(ordering)
+    return orderings
+
+
+def _solveVariant(settings):
+    '''
+    Run one member of a solve_parallel() portfolio in a worker process.
+    Returns the variant number and status with the cells and moves of the
+    tour found, or with None and None
+    '''
+    variant, args, kwargs, possibleMoves = settings
+    kt = KnightsTour(*args, **kwargs)
+    kt.possibleMoves = possibleMoves
+    if kt.solve() is None:
+        return variant, kt.status, None, None
+    return variant, kt.status, kt.cells, kt.moves
+
+
 class KnightsTour:
-    def __init__(self, rows=8, cols=8, startRow=0, startCol=0):
+    STRATEGIES = ('backtrack', 'warnsdorff', 'construct')
+    BOARD_FORMS = ('list', 'view', 'numpy')
+    ENGINES = ('list', 'bitboard')
+    # The largest board the bitboard engine searches. Above it the
+    # unvisited mask is so wide that updating it costs more than keeping
+    # the onward move counts of the list engine
+    BITBOARD_CELLS = 2500
+    TRACES = ('full', 'packed', 'binary', 'count', 'off')
+
+    def __init__(self, rows=8, cols=8, startRow=0, startCol=0,
+                 strategy='backtrack', maxBacktracks=None, engine='list',
+                 prune=False, connectivityInterval=64, seed=None,
+                 restartBase=1000, trace='full', traceLimit=None,
+                 traceFile=None, instrument=False, sampleInterval=0,
+                 onSample=None, checkpointFile=None,
+                 checkpointInterval=1000000):
         '''
         The constructor initializes the board size and the
         possible moves for the knight
@@ -8,45 +191,338 @@ class KnightsTour:
         cols: int, the number of columns of the board
         startRow: int, indicating the starting row of the knight
         startCol: int, indicating the starting column of the knight
+        strategy: str, 'backtrack' tries the moves in a fixed order,
+            'warnsdorff' always moves to the square with the fewest
+            onward moves, 'construct' stitches the tour together from
+            small block tours in linear time (see knightstour_construct)
+        maxBacktracks: int, the number of backtracks the warnsdorff
+            strategy (and construct, on boards narrower than 5) may make
+            before giving up (default: the larger of 10000 and rows * cols)
+        engine: str, 'list' keeps the board as a list of cells during the
+            search, 'bitboard' runs the warnsdorff strategy on boards of up
+            to BITBOARD_CELLS squares with the unvisited squares in a single
+            int bitmask, only building the board once the search is over.
+            Other searches run on the list engine, which is faster for them
+        prune: bool, cut off branches of the list engine search as soon as
+            the unvisited squares can no longer all be toured
+        connectivityInterval: int, with prune set, check every this many
+            nodes that the unvisited squares are still connected (0 never
+            checks)
+        seed: int, randomize the search: the backtrack strategy tries the
+            moves of every square in a shuffled order and the warnsdorff
+            strategy breaks ties at random. The search restarts whenever
+            it runs out of nodes, with budgets of restartBase times the
+            Luby sequence. The same seed always gives the same tour
+        restartBase: int, the node budget unit of randomized restarts
+        trace: str, how the moves are recorded: 'full' keeps a list of
+            (row, col, step) tuples, 'packed' packs them into an int array
+            (see knightstour_trace.PackedTrace), 'binary' writes them to
+            traceFile with keyframes of the board, for random access with
+            knightstour_tracefile.TraceFile (see BinaryTrace), 'count' only
+            counts them and 'off' drops them
+        traceLimit: int, with the packed trace, the number of moves kept in
+            memory. The rest are dropped, or spilled to traceFile
+        traceFile: str, with the packed trace, a file to spill the moves
+            to; with the binary trace, the trace file
+        instrument: bool, keep search counters as the moves are recorded
+            (see getStats). Off, they cost nothing
+        sampleInterval: int, with instrument set, call onSample every this
+            many nodes
+        onSample: callable, called as onSample(stats) with the
+            knightstour_trace.InstrumentedTrace keeping the counters
+        checkpointFile: str, a file solve() writes the state of the plain
+            backtracking search to every checkpointInterval moves and on
+            SIGINT, for knightstour_checkpoint.resume() to carry on from
+        checkpointInterval: int, the number of moves between checkpoints
         '''
-        self.possibleMoves = [
-            (2, 1), (1, 2), (-1, 2), (-2, 1),
-            (-2, -1), (-1, -2), (1, -2), (2, -1)
-        ]
+        if strategy not in self.STRATEGIES:
+            raise ValueError(f'Unknown strategy {strategy!r}, '
+                             f'expected one of {self.STRATEGIES}')
+        if engine not in self.ENGINES:
+            raise ValueError(f'Unknown engine {engine!r}, '
+                             f'expected one of {self.ENGINES}')
+        if trace not in self.TRACES:
+            raise ValueError(f'Unknown trace {trace!r}, '
+                             f'expected one of {self.TRACES}')
+        if not (0 <= startRow < rows and 0 <= startCol < cols):
+            raise ValueError(f'The start square ({startRow}, {startCol}) '
+                             f'is not on the {rows}x{cols} board')
+        if trace == 'binary' and traceFile is None:
+            raise ValueError('The binary trace needs a traceFile')
+        if prune and engine != 'list':
+            raise ValueError('Pruning is only available with the list engine')
+        if seed is not None and engine != 'list':
+            raise ValueError('Randomized restarts are only available with '
+                             'the list engine')
+        if checkpointFile is not None and (
+                strategy != 'backtrack' or engine != 'list' or prune
+                or seed is not None):
+            raise ValueError('Checkpoints are only available with the plain '
+                             'backtracking search')
+        self.possibleMoves = list(KNIGHT_MOVES)
         self.rows = rows
         self.cols = cols
-        self.board = [[-1 for _ in range(self.cols)] for _ in range(self.rows)]
-        self.board[startRow][startCol] = 0
+        # The board, as the step of every flat cell id row * cols + col in
+        # one contiguous int32 buffer (-1 when unvisited)
+        self.cells = array('i', [-1]) * (rows * cols)
+        self.cells[startRow * cols + startCol] = 0
         self.startRow = startRow
         self.startCol = startCol
+        self.strategy = strategy
+        self.maxBacktracks = maxBacktracks
+        self.engine = engine
+        self.prune = prune
+        self.connectivityInterval = connectivityInterval
+        self.seed = seed
+        self.restartBase = restartBase
+        self.trace = trace
+        self.traceLimit = traceLimit
+        self.checkpointFile = checkpointFile
+        self.checkpointInterval = checkpointInterval
+        # The (path, nextIndex) lists of the running backtracking search,
+        # and the ones to resume it from (see knightstour_checkpoint)
+        self._searchState = None
+        self._resumeState = None
+        # The number of nodes cut off by pruning, set by a pruned search
+        self.prunedNodes = 0
+        # The nodes expanded by every attempt of a warnsdorff, pruned or
+        # randomized search, one entry per restart
+        self.attemptNodes = []
         # Store the moves made by the knight, used for visualization
-        self.moves = [(startRow, startCol, 0)]
+        # (the binary trace is kept too, to flush it when a search ends)
+        self.traceWriter = None
+        if trace == 'full':
+            self.moves = []
+        elif trace == 'packed':
+            self.moves = PackedTrace(cols, traceLimit, traceFile)
+        elif trace == 'binary':
+            self.moves = self.traceWriter = BinaryTrace(self, traceFile)
+        elif trace == 'count':
+            self.moves = CountTrace()
+        else:
+            self.moves = NullTrace()
+        # The search counters, when instrumented
+        self.stats = None
+        if instrument:
+            self.stats = InstrumentedTrace(self.moves, rows * cols,
+                                           sampleInterval, onSample)
+            self.moves = self.stats
+        self.moves.append((startRow, startCol, 0))
         # Store the solution status, used for printing the solution
         self.solutionFound = None
+        # The outcome of the last search: 'solved', 'no tour', 'gave up'
+        # when it ran out of backtracks or, when it ran out of budget,
+        # 'exhausted'
+        self.status = None
+        # The budgets of the running search (see solve), and the deepest
+        # path of cells it has found
+        self._deadline = None
+        self._nodesLeft = None
+        self.bestPath = [startRow * cols + startCol]
 
     def getMoves(self):
         '''
-        Get the moves made by the knight
+        Get the moves made by the knight, as a sequence of
+        (row, col, step) tuples where a step of -1 marks a backtrack
         '''
         return self.moves
 
-    def getBoard(self):
+    def getStats(self):
         '''
-        Get a deep copy of the board
+        Get the search counters as a dict (see InstrumentedTrace.snapshot),
+        or None when the tour is not instrumented
         '''
-        return [row[:] for row in self.board]
+        if self.stats is None:
+            return None
+        return self.stats.snapshot()
 
-    def solve(self):
+    @property
+    def board(self):
         '''
-        Solve the knight's tour problem, updating the board and moves
+        The board as a list of row lists, built from the cells
         '''
-        step = 1
-        if self._solveUtil(self.board, self.startRow, self.startCol, step):
-            self.solutionFound = True
+        cols = self.cols
+        return [self.cells[i:i + cols].tolist()
+                for i in range(0, len(self.cells), cols)]
+
+    def getBoard(self, form='list'):
+        '''
+        Get the board, in one of three forms:
+
+        'list': a deep copy, as a list of row lists
+        'view': a read-only memoryview of shape (rows, cols) on the board
+            itself, without copying it
+        'numpy': a read-only int32 ndarray of shape (rows, cols) on the
+            board itself, without copying it
+
+        The views follow the board as later searches change it
+        '''
+        if form == 'list':
             return self.board
+        if form not in self.BOARD_FORMS:
+            raise ValueError(f'Unknown board form {form!r}, '
+                             f'expected one of {self.BOARD_FORMS}')
+        view = memoryview(self.cells).toreadonly()
+        if form == 'view':
+            return view.cast('B').cast('i', (self.rows, self.cols))
+        import numpy as np
+
+        return np.frombuffer(view, dtype=np.int32).reshape(self.rows,
+                                                           self.cols)
+
+    def classify(self):
+        '''
+        Settle from the board dimensions and the start square alone, in
+        constant time, whether a tour from the start square exists:
+
+        'impossible': there is no tour from the start square
+        'closed': the board has a closed tour, so every square starts one
+        'open': there is no closed tour, but there is an open tour from the
+            start square
+        'unknown': there is no closed tour, and whether an open tour starts
+            from this square has to be found out by searching (3xn and 4xn
+            boards)
+        '''
+        rows, cols = self.rows, self.cols
+        if not openTourExists(rows, cols):
+            return 'impossible'
+        if rows * cols % 2 and (self.startRow + self.startCol) % 2:
+            # Every move changes colour, so a tour of an odd board starts
+            # and ends on the colour with the extra square
+            return 'impossible'
+        if closedTourExists(rows, cols):
+            return 'closed'
+        if min(rows, cols) >= 5 or rows * cols == 1:
+            return 'open'
+        return 'unknown'
+
+    def solve(self, timeout=None, maxNodes=None):
+        '''
+        Solve the knight's tour problem, updating the board and moves.
+        Boards that classify() proves to have no tour from the start
+        square return None straight away, without searching
+
+        timeout: float, the number of seconds the search may run for
+        maxNodes: int, the number of nodes the search may expand
+
+        Once either budget runs out the search stops, status is set to
+        'exhausted' and the board holds the deepest partial tour found
+        (unvisited squares are -1), which is returned instead of None.
+        Otherwise status is 'solved', 'no tour' or, when a search with a
+        backtrack budget (see maxBacktracks) gave up before settling the
+        problem, 'gave up', which returns None too
+        '''
+        if self.classify() == 'impossible':
+            self.solutionFound = False
+            self.status = 'no tour'
+            return None
+        if self.stats is not None:
+            self.stats.start()
+        step = 1
+        cells = self.cells.tolist()
+        startCell = self.startRow * self.cols + self.startCol
+        budgeted = self._startBudget(startCell, timeout, maxNodes)
+        if budgeted and self.checkpointFile is not None:
+            raise ValueError('Checkpointed searches cannot take a budget')
+        if self.strategy == 'construct':
+            solved = self._solveConstruct(cells, startCell)
+        elif self.seed is not None:
+            solved = self._solveRestarts(cells, startCell)
+        elif self._useBitboard() and not budgeted:
+            solved = self._solveBitboard(cells, startCell)
+        elif budgeted or self.strategy == 'warnsdorff' or self.prune:
+            # The bitboard engine and _solveUtil make the same moves, but
+            # only this search keeps to a budget
+            solved = self._solveOrdered(cells, startCell)
+        elif self.checkpointFile is not None:
+            solved = self._solveCheckpointed(cells, startCell)
         else:
+            solved = self._solveUtil(cells, startCell, step)
+        return self._finish(cells, solved)
+
+    def solve_iter(self, timeout=None, maxNodes=None):
+        '''
+        Solve the knight's tour problem lazily: a generator of the same
+        (row, col, step) events solve() records in the moves, yielded as
+        the search makes them and not recorded. The search only runs while
+        the generator is advanced, so a consumer can pause it between
+        events and stop it with close(), which leaves the partial tour on
+        the board. Once the search is over the board is updated and the
+        generator returns what solve() would, with the same budgets. The
+        search always runs on the list engine, which makes the same moves
+        as the bitboard one
+        '''
+        yield (self.startRow, self.startCol, 0)
+        if self.classify() == 'impossible':
             self.solutionFound = False
+            self.status = 'no tour'
             return None
+        cells = self.cells.tolist()
+        startCell = self.startRow * self.cols + self.startCol
+        self._startBudget(startCell, timeout, maxNodes)
+        if self.strategy == 'construct':
+            events = self._iterConstruct(cells, startCell)
+        elif self.seed is not None:
+            events = self._iterRestarts(cells, startCell)
+        else:
+            # Without warnsdorff or prune this is the plain backtracking
+            # search of _solveUtil, move for move
+            events = self._iterOrdered(cells, startCell)
+        try:
+            solved = yield from events
+        finally:
+            self._storeBoard(cells)
+        return self._finish(cells, solved)
+
+    def solve_parallel(self, workers=4):
+        '''
+        Solve the knight's tour problem with a portfolio of workers
+        searches in a process pool, each trying the moves in a different
+        order (see portfolioOrderings). The first tour found wins and the
+        other searches are stopped. Updates the board, moves and
+        possibleMoves from the winning search, and returns the board like
+        solve() does. Without a winner, status is 'no tour' if any search
+        settled that, and 'gave up' otherwise. The workers record the
+        trace in memory, never in a traceFile, and keep the counters of an
+        instrumented tour without calling onSample; the winner's counters
+        replace the stats
+        '''
+        if self.classify() == 'impossible':
+            self.solutionFound = False
+            self.status = 'no tour'
+            return None
+        args = (self.rows, self.cols, self.startRow, self.startCol)
+        kwargs = dict(strategy=self.strategy,
+                      maxBacktracks=self.maxBacktracks, engine=self.engine,
+                      prune=self.prune,
+                      connectivityInterval=self.connectivityInterval,
+                      seed=self.seed, restartBase=self.restartBase,
+                      trace='packed' if self.trace == 'binary'
+                      else self.trace, traceLimit=self.traceLimit,
+                      instrument=self.stats is not None)
+        orderings = portfolioOrderings(self.possibleMoves, workers)
+        tasks = [(variant, args, kwargs, ordering)
+                 for variant, ordering in enumerate(orderings)]
+
+        status = 'gave up'
+        # Leaving the with block terminates the searches still running
+        with Pool(workers) as pool:
+            for variant, result, cells, moves in pool.imap_unordered(
+                    _solveVariant, tasks):
+                if result == 'no tour':
+                    status = result
+                if cells is not None:
+                    self.possibleMoves = orderings[variant]
+                    self._storeBoard(cells)
+                    self.moves = moves
+                    if self.stats is not None:
+                        self.stats = moves
+                    self.solutionFound = True
+                    self.status = 'solved'
+                    return self.board
+        self.solutionFound = False
+        self.status = status
+        return None
 
     def printSolution(self):
         '''
@@ -55,47 +531,472 @@ class KnightsTour:
         '''
         if self.solutionFound is None:
             print('Problem not solved yet, call the solve() method first')
+        elif self.status == 'gave up':
+            print(f'The search gave up after {self._maxBacktracks()} '
+                  f'backtracks on the {self.rows}x{self.cols} board, '
+                  f'starting from row {self.startRow}, column '
+                  f'{self.startCol}, without settling whether it has a tour')
+        elif self.status == 'exhausted':
+            print(f'Search budget exhausted for {self.rows}x{self.cols} '
+                  f'board, the deepest partial tour found reaches step '
+                  f'{len(self.bestPath) - 1}:')
+            for row in self.getBoard():
+                print(' '.join(str(cell) for cell in row))
         elif self.solutionFound is False:
             print(f'No solution found for {self.rows}x{self.cols} board, '
                   f'starting from row {self.startRow}, column {self.startCol}')
         else:
-            for row in self.board:
+            for row in self.getBoard():
                 print(' '.join(str(cell) for cell in row))
 
-    def _canMove(self, x, y, board):
+    def _startBudget(self, startCell, timeout, maxNodes):
         '''
-        Check if the knight can move to cell x, y
-        (x, y) is valid if it is inside the board and the cell is not visited
+        Set up the budgets of a search, and the deepest path found so far.
+        Returns whether there is a budget
         '''
-        return 0 <= x < self.rows and 0 <= y < self.cols and board[x][y] == -1
+        self._deadline = None
+        if timeout is not None:
+            self._deadline = time.perf_counter() + timeout
+        self._nodesLeft = maxNodes
+        self.bestPath = [startCell]
+        return timeout is not None or maxNodes is not None
 
-    def _solveUtil(self, board, currRow, currCol, step):
+    def _finish(self, cells, solved):
         '''
-        The recursive utility function to solve the knight's tour problem
+        Store the outcome of a search: the tour, nothing, or, when the
+        search ran out of budget (solved is None), the deepest partial tour.
+        solved is 'gave up' when the search ran out of backtracks
         '''
-        if step == self.rows * self.cols:
-            return True
+        if solved is None:
+            for step, currCell in enumerate(self.bestPath):
+                cells[currCell] = step
+        self._storeBoard(cells)
+        if self.traceWriter is not None:
+            # Write out the end of the binary trace for other readers
+            self.traceWriter.flush()
+        if solved is True:
+            self.solutionFound = True
+            self.status = 'solved'
+            return self.board
+        self.solutionFound = False
+        if solved is None:
+            self.status = 'exhausted'
+            return self.board
+        self.status = 'gave up' if solved == 'gave up' else 'no tour'
+        return None
 
-        # Try all possible moves from the current coordinate R, C
-        for moveRow, moveCol in self.possibleMoves:
-            newRow, newCol = currRow + moveRow, currCol + moveCol
-            # if the new move is valid
-            # mark the cell as visited and continue searching
-            if self._canMove(newRow, newCol, board):
-                board[newRow][newCol] = step
-                self.moves.append((newRow, newCol, step))
+    def _storeBoard(self, cells):
+        '''
+        Copy the flat cell values used by the search back into the board,
+        in place so that views on it stay valid
+        '''
+        self.cells[:] = array('i', cells)
+
+    def _record(self, events):
+        '''
+        Append the events of a search generator to the moves, and return
+        the value the generator returns
+        '''
+        result = []
+
+        def run():
+            result.append((yield from events))
+
+        append = self.moves.append
+        for event in run():
+            append(event)
+        return result[0]
+
+    def _maxBacktracks(self):
+        '''
+        The backtrack budget of the search, None when it is unbounded
+        '''
+        if self.strategy == 'backtrack':
+            return None
+        if self.maxBacktracks is None:
+            return max(10000, self.rows * self.cols)
+        return self.maxBacktracks
+
+    def _neighbours(self):
+        '''
+        The shared neighbour table for this board size and move ordering
+        '''
+        return neighbourTable(self.rows, self.cols, tuple(self.possibleMoves))
+
+    def _solveUtil(self, cells, currCell, step, path=None, nextIndex=None):
+        '''
+        The backtracking utility function to solve the knight's tour problem.
+        It keeps an explicit stack of (cell, index of the next move to try)
+        entries instead of recursing, so the board size is not capped by
+        Python's recursion limit. Given the path and nextIndex of a search
+        that was stopped, it carries on from there. The state is whole
+        whenever a move is recorded, for checkpoints to save it
+        '''
+        total = self.rows * self.cols
+        neighbours = self._neighbours()
+        coords = cellCoords(self.rows, self.cols)
+        moves = self.moves
+
+        if path is None:
+            path = [currCell]
+            nextIndex = [0]
+        self._searchState = (path, nextIndex)
+        while step < total:
+            currCell = path[-1]
+            candidates = neighbours[currCell]
+            index = nextIndex[-1]
+            # Find the next unvisited neighbour of the current cell
+            while index < len(candidates):
+                newCell = candidates[index]
+                index += 1
+                if cells[newCell] == -1:
+                    break
+            else:
+                # Backtrack if no solution is found from this cell
+                path.pop()
+                nextIndex.pop()
+                if not path:
+                    return False
+                step -= 1
+                cells[currCell] = -1
+                moves.append((*coords[currCell], -1))
+                continue
+
+            # Mark the cell as visited and continue searching from it
+            nextIndex[-1] = index
+            cells[newCell] = step
+            path.append(newCell)
+            nextIndex.append(0)
+            moves.append((*coords[newCell], step))
+            step += 1
+        return True
+
+    def _solveCheckpointed(self, cells, startCell):
+        '''
+        Run _solveUtil() from the start or from a resumed state, writing
+        checkpoints through a CheckpointTrace around the moves. SIGINT
+        writes a checkpoint before the KeyboardInterrupt is raised
+        '''
+        from knightstour_checkpoint import CheckpointTrace
+
+        path, nextIndex = self._resumeState or (None, None)
+        self._resumeState = None
+        if path and self.stats is not None:
+            # A resumed search starts at the depth it stopped at
+            self.stats.depth = len(path) - 1
+        moves = self.moves
+        self.moves = CheckpointTrace(self, moves, self.checkpointFile,
+                                     self.checkpointInterval)
+        try:
+            handler = signal.signal(signal.SIGINT, self.moves.interrupt)
+        except ValueError:
+            # Signal handlers can only be set from the main thread
+            handler = None
+        try:
+            return self._solveUtil(cells, startCell,
+                                   len(path) if path else 1, path,
+                                   nextIndex)
+        finally:
+            if handler is not None:
+                signal.signal(signal.SIGINT, handler)
+            self.moves = moves
+
+    def _orderedMoves(self, cells, degrees, neighbours, currCell, rng=None):
+        '''
+        The unvisited neighbours of currCell. The warnsdorff strategy puts
+        the fewest onward moves first, with ties going to the cell farthest
+        from the centre of the board, then to the earlier entry in
+        possibleMoves. Otherwise they keep the possibleMoves order. Given a
+        random generator rng, ties are broken at random, or the whole
+        order is shuffled
+        '''
+        if self.strategy != 'warnsdorff':
+            candidates = [newCell for newCell in neighbours[currCell]
+                          if cells[newCell] == -1]
+            if rng is not None:
+                rng.shuffle(candidates)
+            return candidates
+        if rng is not None:
+            return sorted((newCell for newCell in neighbours[currCell]
+                           if cells[newCell] == -1),
+                          key=lambda newCell: (degrees[newCell],
+                                               rng.random()))
+        candidates = []
+        for index, newCell in enumerate(neighbours[currCell]):
+            if cells[newCell] == -1:
+                newRow, newCol = divmod(newCell, self.cols)
+                distance = ((2 * newRow - self.rows + 1) ** 2 +
+                            (2 * newCol - self.cols + 1) ** 2)
+                candidates.append((degrees[newCell], -distance,
+                                   index, newCell))
+        candidates.sort()
+        return [newCell for *_, newCell in candidates]
+
+    def _disconnected(self, cells, neighbours, currCell, remaining):
+        '''
+        Whether some of the remaining unvisited cells cannot be reached
+        from currCell through unvisited cells
+        '''
+        seen = {newCell for newCell in neighbours[currCell]
+                if cells[newCell] == -1}
+        queue = list(seen)
+        while queue:
+            for newCell in neighbours[queue.pop()]:
+                if cells[newCell] == -1 and newCell not in seen:
+                    seen.add(newCell)
+                    queue.append(newCell)
+        return len(seen) < remaining
+
+    def _iterOrdered(self, cells, startCell, rng=None, maxNodes=None):
+        '''
+        The search behind the warnsdorff strategy and behind pruned and
+        randomized searches. It keeps the onward move count of every cell
+        up to date as cells are visited and released, uses them to order
+        the moves (warnsdorff) and, with prune set, to cut off the branches
+        that stranded() or, every connectivityInterval nodes,
+        _disconnected() rejects. The warnsdorff strategy gives up after
+        maxBacktracks backtracks. A generator of the (row, col, step)
+        events of the search, which returns whether it found a tour, or,
+        with the board as it was before, 'gave up' once it has run out of
+        backtracks and None once maxNodes nodes have been expanded or the
+        budgets of the running search (see _startBudget) have run out.
+        Under a budget it keeps the deepest path found in bestPath
+        '''
+        total = self.rows * self.cols
+        maxBacktracks = self._maxBacktracks()
+        backtracks = 0
+        neighbours = self._neighbours()
+        coords = cellCoords(self.rows, self.cols)
+        prune = self.prune
+        interval = self.connectivityInterval
+        nodes = 0
+        deadline = self._deadline
+        nodesLeft = self._nodesLeft
+        if nodesLeft is not None and (maxNodes is None
+                                      or nodesLeft < maxNodes):
+            maxNodes = nodesLeft
+        anytime = deadline is not None or nodesLeft is not None
+        # best shares its first shared cells with path
+        best = self.bestPath
+        shared = 1
+
+        degrees = [len(candidates) for candidates in neighbours]
+        lowCounts = None
+        if prune:
+            lowCounts = [degrees.count(0), degrees.count(1)]
+        updateDegrees(cells, degrees, neighbours, startCell, -1, lowCounts)
+        path = [startCell]
+        stack = [self._orderedMoves(cells, degrees, neighbours, startCell,
+                                    rng)]
+        nextIndex = [0]
+
+        while len(path) < total:
+            candidates, index = stack[-1], nextIndex[-1]
+            if nodes == maxNodes:
+                # Out of nodes: unwind the path for the next attempt
+                for currCell in reversed(path[1:]):
+                    cells[currCell] = -1
+                    yield (*coords[currCell], -1)
+                self._spend(nodes)
+                return None
+            if index < len(candidates):
+                # Move to the next best candidate
+                nextIndex[-1] = index + 1
+                newCell = candidates[index]
+                step = len(path)
+                cells[newCell] = step
+                yield (*coords[newCell], step)
+                updateDegrees(cells, degrees, neighbours, newCell, -1,
+                              lowCounts)
+                path.append(newCell)
+                nodes += 1
+                if anytime:
+                    if step >= len(best):
+                        best[shared:] = path[shared:]
+                        shared = step + 1
+                    if (deadline is not None and not nodes & 1023
+                            and time.perf_counter() > deadline):
+                        # Out of time: stop at the top of the loop
+                        maxNodes = nodes
+                if prune and step + 1 < total and (
+                        stranded(cells, degrees, neighbours, newCell,
+                                 lowCounts)
+                        or interval and nodes % interval == 0
+                        and self._disconnected(cells, neighbours, newCell,
+                                               total - step - 1)):
+                    # Go straight back without expanding the new cell
+                    self.prunedNodes += 1
+                    stack.append(())
+                else:
+                    stack.append(self._orderedMoves(cells, degrees,
+                                                    neighbours, newCell, rng))
+                nextIndex.append(0)
+                continue
+
+            # Dead end: backtrack if the budget allows it
+            stack.pop()
+            nextIndex.pop()
+            if len(path) == 1 or backtracks == maxBacktracks:
+                # Leave the board as it was before the search
+                for currCell in path[1:]:
+                    cells[currCell] = -1
+                self._spend(nodes)
+                return False if len(path) == 1 else 'gave up'
+            backtracks += 1
+            currCell = path.pop()
+            if shared > len(path):
+                shared = len(path)
+            cells[currCell] = -1
+            yield (*coords[currCell], -1)
+            updateDegrees(cells, degrees, neighbours, currCell, 1,
+                          lowCounts)
+        self._spend(nodes)
+        return True
+
+    def _spend(self, nodes):
+        '''
+        Account for the nodes expanded by an attempt of _iterOrdered()
+        '''
+        self.attemptNodes.append(nodes)
+        if self._nodesLeft is not None:
+            self._nodesLeft -= nodes
+
+    def _exhausted(self):
+        '''
+        Whether the budgets of the running search have run out
+        '''
+        return (self._nodesLeft == 0 or self._deadline is not None
+                and time.perf_counter() > self._deadline)
+
+    def _solveOrdered(self, cells, startCell, rng=None, maxNodes=None):
+        '''
+        Run _iterOrdered(), recording its moves
+        '''
+        return self._record(self._iterOrdered(cells, startCell, rng,
+                                              maxNodes))
+
+    def _iterRestarts(self, cells, startCell):
+        '''
+        Las Vegas search: randomized searches seeded from self.seed, each
+        restarted from scratch once it has expanded restartBase times the
+        next Luby number of nodes. A search that ends within its budget
+        settles the problem either way, and so does a warnsdorff search
+        that runs out of backtracks when classify() cannot promise a tour.
+        On a board with a tour it restarts instead. Returns None once the
+        budgets of the running search have run out
+        '''
+        rng = random.Random(self.seed)
+        tourExists = self.classify() in ('closed', 'open')
+        attempt = 1
+        while True:
+            maxNodes = self.restartBase * luby(attempt)
+            solved = yield from self._iterOrdered(cells, startCell, rng,
+                                                  maxNodes)
+            if solved == 'gave up' and tourExists:
+                solved = None
+            if solved is not None or self._exhausted():
+                return solved
+            attempt += 1
 
-                # Recursively look for solutions from the new move
-                if self._solveUtil(board, newRow, newCol, step + 1):
-                    return True
+    def _solveRestarts(self, cells, startCell):
+        '''
+        Run _iterRestarts(), recording its moves
+        '''
+        return self._record(self._iterRestarts(cells, startCell))
+
+    def _iterConstruct(self, cells, startCell):
+        '''
+        Build the tour with the divide-and-conquer construction instead of
+        searching for it. It needs both sides of the board to be at least
+        5, so narrower boards fall back to the Warnsdorff search
+        '''
+        from knightstour_construct import ConstructedTour
+
+        if min(self.rows, self.cols) < 5:
+            return (yield from self._iterOrdered(cells, startCell))
+        tour = ConstructedTour(self.rows, self.cols,
+                               self.startRow, self.startCol)
+        for step, (newRow, newCol) in enumerate(tour.iterPath()):
+            cells[newRow * self.cols + newCol] = step
+            if step:
+                yield newRow, newCol, step
+        return True
+
+    def _solveConstruct(self, cells, startCell):
+        '''
+        Run _iterConstruct(), recording its moves
+        '''
+        return self._record(self._iterConstruct(cells, startCell))
+
+    def _useBitboard(self):
+        '''
+        Whether solve() runs on the bitboard engine: only for the
+        warnsdorff strategy on boards of up to BITBOARD_CELLS squares. A
+        move costs an AND and a popcount as wide as the board, so plain
+        backtracking, which needs no onward move counts, and larger boards
+        are faster on the list engine
+        '''
+        return (self.engine == 'bitboard' and self.strategy == 'warnsdorff'
+                and self.rows * self.cols <= self.BITBOARD_CELLS)
+
+    def _solveBitboard(self, cells, startCell):
+        '''
+        The warnsdorff search on a bitboard: the unvisited squares are the
+        set bits of a single int, so the unvisited neighbours of a cell are
+        one AND with its neighbour mask and their onward degree is a
+        popcount. Only the path is kept during the search; cells is filled
+        in once it is over
+        '''
+        total = self.rows * self.cols
+        maxBacktracks = self._maxBacktracks()
+        backtracks = 0
+        possibleMoves = tuple(self.possibleMoves)
+        neighbours = neighbourTable(self.rows, self.cols, possibleMoves)
+        masks = neighbourMasks(self.rows, self.cols, possibleMoves)
+        coords = cellCoords(self.rows, self.cols)
+        moves = self.moves
+        distances = [(2 * i - self.rows + 1) ** 2 +
+                     (2 * j - self.cols + 1) ** 2 for i, j in coords]
 
-                # Backtrack if no solution is found
-                board[newRow][newCol] = -1
-                self.moves.append((newRow, newCol, -1))
-        return False
+        unvisited = ((1 << total) - 1) ^ (1 << startCell)
+        path = [startCell]
+        stack = [None]
+        nextIndex = [0]
+        while unvisited:
+            currCell = path[-1]
+            candidates = stack[-1]
+            if candidates is None:
+                # First visit of this cell: collect its unvisited neighbours
+                free = masks[currCell] & unvisited
+                candidates = [newCell for newCell in neighbours[currCell]
+                              if free >> newCell & 1] if free else ()
+                if len(candidates) > 1:
+                    candidates.sort(key=lambda newCell: (
+                        (masks[newCell] & unvisited).bit_count(),
+                        -distances[newCell]))
+                stack[-1] = candidates
+            index = nextIndex[-1]
+            if index < len(candidates):
+                # Move to the next candidate
+                nextIndex[-1] = index + 1
+                newCell = candidates[index]
+                unvisited ^= 1 << newCell
+                moves.append((*coords[newCell], len(path)))
+                path.append(newCell)
+                stack.append(None)
+                nextIndex.append(0)
+                continue
 
+            # Dead end: backtrack if the budget allows it
+            stack.pop()
+            nextIndex.pop()
+            if len(path) == 1 or backtracks == maxBacktracks:
+                return False if len(path) == 1 else 'gave up'
+            backtracks += 1
+            path.pop()
+            unvisited |= 1 << currCell
+            moves.append((*coords[currCell], -1))
 
-if __name__ == '__main__':
-    kt = KnightsTour(3, 4, 0, 0)
-    chessboard = kt.solve()
-    kt.printSolution()
+        for step, currCell in enumerate(path):
+            cells[currCell] = step
+        return True
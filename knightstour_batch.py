@@ -0,0 +1,104 @@
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from knightstour import KnightsTour, closedTourExists
+from knightstour_cache import defaultOptions, symmetries
+
+
+def _solveStart(task):
+    '''
+    Solve one canonical start square in a worker process. Returns its
+    flat int32 cells, or None if there is no tour from it
+    '''
+    rows, cols, startRow, startCol, options = task
+    kt = KnightsTour(rows, cols, startRow, startCol, **options)
+    kt.solve()
+    if kt.status != 'solved':
+        return None
+    return kt.cells
+
+
+def _closedTourSteps(rows, cols):
+    '''
+    The step numbers of one closed tour of the board, as a flat array, or
+    None when the construction cannot build one
+    '''
+    from knightstour_construct import ConstructedTour
+
+    if min(rows, cols) < 5 or not closedTourExists(rows, cols):
+        return None
+    return np.array(ConstructedTour(rows, cols).getSteps(), dtype=np.int32)
+
+
+def solve_all_starts(rows, cols, workers=None, **options):
+    '''
+    Solve the knight's tour problem from every start square of a board at
+    once. Returns an int32 array of shape (rows, cols, rows, cols) whose
+    entry [startRow, startCol] is the board of a tour from that square, or
+    all -1 when there is none, so (boards >= 0).all(axis=(2, 3)) tells
+    which squares start a tour
+
+    Boards with a closed tour only build one: the tour from any square is
+    the same cycle numbered from there. Other boards only search from one
+    start square of every symmetry class, in a process pool, and map its
+    tour onto the rest of the class
+
+    workers: int, the number of worker processes (default: one per core)
+    options: passed on to KnightsTour (default: see
+        knightstour_cache.defaultOptions, with no trace)
+    '''
+    total = rows * cols
+    boards = np.full((total, total), -1, dtype=np.int32)
+
+    steps = _closedTourSteps(rows, cols)
+    if steps is not None:
+        # boards[s] is the cycle shifted so that cell s gets step 0
+        boards[:] = (steps[None, :] - steps[:, None]) % total
+        return boards.reshape(rows, cols, rows, cols)
+
+    if not options:
+        # The construction builds an open tour from every square that has
+        # one on boards whose sides are at least 5
+        options = defaultOptions(rows, cols)
+    options.setdefault('trace', 'off')
+    transforms = symmetries(rows, cols)
+    # The flat cell every cell maps to under every symmetry
+    images = [
+        np.array([row * cols + col for row, col in
+                  (transform(i, j) for i in range(rows) for j in range(cols))],
+                 dtype=np.intp)
+        for transform in transforms
+    ]
+    # The start squares of every symmetry class, with the symmetry that
+    # maps each of them onto the canonical square of the class (the
+    # smallest image, as in knightstour_cache.canonicalStart)
+    classes = {}
+    # classify() only looks at the size and the start square, so one tour
+    # serves to classify every square
+    probe = KnightsTour(rows, cols, trace='off')
+    for startRow in range(rows):
+        for startCol in range(cols):
+            probe.startRow, probe.startCol = startRow, startCol
+            if probe.classify() == 'impossible':
+                continue
+            index = min(range(len(transforms)), key=lambda index:
+                        transforms[index](startRow, startCol))
+            canon = transforms[index](startRow, startCol)
+            classes.setdefault(canon, []).append((startRow * cols + startCol,
+                                                  images[index]))
+    tasks = [(rows, cols, *canon, options) for canon in classes]
+    with ProcessPoolExecutor(workers) as pool:
+        for canon, board in zip(classes, pool.map(_solveStart, tasks)):
+            if board is None:
+                continue
+            board = np.frombuffer(board, dtype=np.int32)
+            for startCell, image in classes[canon]:
+                # The image of a tour from the canonical square under the
+                # inverse symmetry is a tour from startCell
+                boards[startCell] = board[image]
+    return boards.reshape(rows, cols, rows, cols)
+
+
+if __name__ == '__main__':
+    boards = solve_all_starts(5, 5)
+    available = (boards >= 0).all(axis=(2, 3))
+    print(available.astype(int))
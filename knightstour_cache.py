@@ -0,0 +1,219 @@
+import sqlite3
+from array import array
+from collections import OrderedDict
+from knightstour import KnightsTour
+
+
+def symmetries(rows, cols):
+    '''
+    The symmetries of a rows x cols board as functions mapping a square
+    (row, col) to its image: the 4 reflections and rotations that keep a
+    rectangle in place, plus the 4 that swap rows and columns when the
+    board is square
+    '''
+    lastRow, lastCol = rows - 1, cols - 1
+    transforms = [
+        lambda i, j: (i, j),
+        lambda i, j: (lastRow - i, j),
+        lambda i, j: (i, lastCol - j),
+        lambda i, j: (lastRow - i, lastCol - j),
+    ]
+    if rows == cols:
+        transforms += [
+            lambda i, j: (j, i),
+            lambda i, j: (lastCol - j, i),
+            lambda i, j: (j, lastRow - i),
+            lambda i, j: (lastCol - j, lastRow - i),
+        ]
+    return transforms
+
+
+def defaultOptions(rows, cols):
+    '''
+    The KnightsTour options a query is solved with when none are given:
+    the linear-time construction on boards whose sides are at least 5,
+    and on narrower boards a pruned search with randomized restarts. That
+    search settles every start square, with a tour or not, of boards up to
+    3x24 and 4x7 within about a second, but takes exponentially longer on
+    longer boards
+    '''
+    if min(rows, cols) >= 5:
+        return {'strategy': 'construct'}
+    return {'prune': True, 'seed': 0}
+
+
+def canonicalStart(rows, cols, startRow, startCol):
+    '''
+    The representative of the start square under the symmetries of the
+    board (the smallest of its images), and a symmetry that maps the start
+    square onto it
+    '''
+    transform = min(symmetries(rows, cols),
+                    key=lambda transform: transform(startRow, startCol))
+    return transform(startRow, startCol), transform
+
+
+class SolutionCache:
+    def __init__(self, path=None, maxsize=4096, **options):
+        '''
+        A store of solved boards keyed by (rows, cols, startRow, startCol).
+        Only the canonical start square of every symmetry class is ever
+        solved; the tours of the other squares are mapped from its tour
+
+        path: str, an sqlite database to keep the canonical tours in
+            across runs (default: memory only)
+        maxsize: int, the number of boards kept in the in-memory LRU layer
+        options: passed on to KnightsTour to solve a canonical query
+            (default: see defaultOptions)
+        '''
+        self.maxsize = maxsize
+        self.options = options
+        self.boards = OrderedDict()
+        self.db = None
+        if path is not None:
+            self.db = sqlite3.connect(path)
+            self.db.execute(
+                'CREATE TABLE IF NOT EXISTS tours ('
+                'rows INTEGER, cols INTEGER, startRow INTEGER, '
+                'startCol INTEGER, board BLOB, '
+                'PRIMARY KEY (rows, cols, startRow, startCol))'
+            )
+
+    def get(self, rows, cols, startRow, startCol):
+        '''
+        Get the solved board for a start square in the format solve()
+        returns, or None if there is no tour from it. Raises RuntimeError
+        when the search gives up (see maxBacktracks) without settling that,
+        and remembers nothing
+        '''
+        found, board = self._lookup((rows, cols, startRow, startCol), True)
+        if not found:
+            raise RuntimeError(f'The search gave up on the {rows}x{cols} '
+                               f'board, starting from row {startRow}, '
+                               f'column {startCol}, before finding a tour')
+        return board
+
+    def peek(self, rows, cols, startRow, startCol):
+        '''
+        Look a start square up without solving anything. Returns whether
+        its board is known, and the board as get() returns it
+        '''
+        return self._lookup((rows, cols, startRow, startCol), False)
+
+    def put(self, rows, cols, startRow, startCol, board):
+        '''
+        Add the board of a start square solved elsewhere (None if there is
+        no tour from it). It is kept for the canonical square as well, so
+        it answers the whole symmetry class
+        '''
+        key = (rows, cols, startRow, startCol)
+        board = board and tuple(tuple(row) for row in board)
+        (canonRow, canonCol), transform = canonicalStart(*key)
+        canon = board
+        if board and (canonRow, canonCol) != (startRow, startCol):
+            cells = [[-1] * cols for _ in range(rows)]
+            for row in range(rows):
+                for col in range(cols):
+                    i, j = transform(row, col)
+                    cells[i][j] = board[row][col]
+            canon = tuple(tuple(row) for row in cells)
+        canonKey = (rows, cols, canonRow, canonCol)
+        self._store(canonKey, canon)
+        self._remember(canonKey, canon)
+        self._remember(key, board)
+
+    def _lookup(self, key, solve):
+        if key in self.boards:
+            self.boards.move_to_end(key)
+            board = self.boards[key]
+        else:
+            rows, cols = key[:2]
+            (canonRow, canonCol), transform = canonicalStart(*key)
+            found, canon = self._canonical(rows, cols, canonRow, canonCol,
+                                           solve)
+            if not found:
+                return False, None
+            board = canon and tuple(
+                tuple(canon[i][j] for i, j in (transform(row, col)
+                                               for col in range(cols)))
+                for row in range(rows)
+            )
+            self._remember(key, board)
+        return True, board and [list(row) for row in board]
+
+    def close(self):
+        '''
+        Close the on-disk layer
+        '''
+        if self.db is not None:
+            self.db.close()
+            self.db = None
+
+    def _remember(self, key, board):
+        self.boards[key] = board
+        self.boards.move_to_end(key)
+        if len(self.boards) > self.maxsize:
+            self.boards.popitem(last=False)
+
+    def _canonical(self, rows, cols, startRow, startCol, solve=True):
+        '''
+        The board of a canonical query, from memory, from disk or, with
+        solve set, solved. Returns whether it was found and the board; a
+        search that gives up finds nothing
+        '''
+        key = (rows, cols, startRow, startCol)
+        if key in self.boards:
+            self.boards.move_to_end(key)
+            return True, self.boards[key]
+        found, board = self._load(key)
+        if not found:
+            if not solve:
+                return False, None
+            kt = KnightsTour(rows, cols, startRow, startCol,
+                             **(self.options or defaultOptions(rows, cols)))
+            solution = kt.solve()
+            board = solution and tuple(tuple(row) for row in solution)
+            if kt.status not in ('solved', 'no tour'):
+                # A search that gave up has not settled the query
+                return False, None
+            self._store(key, board)
+        self._remember(key, board)
+        return True, board
+
+    def _load(self, key):
+        '''
+        Look a canonical query up on disk. Returns whether it was there and
+        its board
+        '''
+        if self.db is None:
+            return False, None
+        row = self.db.execute(
+            'SELECT board FROM tours WHERE rows = ? AND cols = ? '
+            'AND startRow = ? AND startCol = ?', key).fetchone()
+        if row is None:
+            return False, None
+        if row[0] is None:
+            return True, None
+        cells = array('i')
+        cells.frombytes(row[0])
+        cols = key[1]
+        return True, tuple(tuple(cells[i:i + cols])
+                           for i in range(0, len(cells), cols))
+
+    def _store(self, key, board):
+        '''
+        Save the board of a canonical query on disk, as packed int32 steps
+        '''
+        if self.db is None:
+            return
+        blob = board and array('i', [cell for row in board
+                                     for cell in row]).tobytes()
+        with self.db:
+            self.db.execute('INSERT OR REPLACE INTO tours VALUES '
+                            '(?, ?, ?, ?, ?)', key + (blob,))
+
+
+if __name__ == '__main__':
+    cache = SolutionCache()
+    for row in cache.get(8, 8, 7, 7):
+        print(' '.join(f'{cell:2}' for cell in row))
@@ -0,0 +1,117 @@
+import os
+import struct
+from array import array
+from collections.abc import Sequence
+from knightstour import KnightsTour
+
+
+MAGIC = b'KTCP'
+VERSION = 1
+# magic, version, rows, cols, startRow, startCol, number of possible
+# moves, depth of the path
+HEADER = struct.Struct('<4sHIIIIHI')
+
+
+def saveCheckpoint(file, tour):
+    '''
+    Write the state of the running backtracking search of tour to file:
+    the board size, the start square, the move ordering, the path of cells
+    and the index of the next move to try at every depth. The board is
+    the path, so it is not stored. The file is replaced atomically, so an
+    interrupted write leaves the previous checkpoint in place
+    '''
+    path, nextIndex = tour._searchState
+    temp = f'{file}.tmp'
+    with open(temp, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, tour.rows, tour.cols,
+                            tour.startRow, tour.startCol,
+                            len(tour.possibleMoves), len(path)))
+        array('b', [offset for move in tour.possibleMoves
+                    for offset in move]).tofile(f)
+        array('i', path).tofile(f)
+        array('B', nextIndex).tofile(f)
+    os.replace(temp, file)
+
+
+def resume(file, **options):
+    '''
+    Load a checkpoint written by saveCheckpoint() into a new KnightsTour,
+    whose solve() carries on the search exactly where it stopped, and
+    keeps writing checkpoints to the same file
+
+    options: passed on to KnightsTour (trace, instrument,
+        checkpointInterval, ...)
+    '''
+    with open(file, 'rb') as f:
+        (magic, version, rows, cols, startRow, startCol, moveCount,
+         depth) = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f'{file} is not a knight\'s tour checkpoint')
+        offsets = array('b')
+        offsets.fromfile(f, 2 * moveCount)
+        path = array('i')
+        path.fromfile(f, depth)
+        nextIndex = array('B')
+        nextIndex.fromfile(f, depth)
+
+    options.setdefault('checkpointFile', file)
+    kt = KnightsTour(rows, cols, startRow, startCol, **options)
+    kt.possibleMoves = [(offsets[i], offsets[i + 1])
+                        for i in range(0, len(offsets), 2)]
+    for step, currCell in enumerate(path):
+        kt.cells[currCell] = step
+    kt._resumeState = (list(path), list(nextIndex))
+    return kt
+
+
+class CheckpointTrace(Sequence):
+    def __init__(self, tour, trace, file, interval):
+        '''
+        A move trace that writes a checkpoint of the search of tour every
+        interval moves, and passes the moves on to another trace. The
+        search calls append() between moves, when its state is whole
+
+        After interrupt() (a SIGINT handler) it writes a checkpoint at the
+        next move and raises KeyboardInterrupt
+        '''
+        self.tour = tour
+        self.trace = trace
+        self.file = file
+        self.interval = interval
+        self.countdown = interval
+        self.interrupted = False
+
+    def append(self, move):
+        self.trace.append(move)
+        self.countdown -= 1
+        if not self.countdown:
+            self.countdown = self.interval
+            saveCheckpoint(self.file, self.tour)
+            if self.interrupted:
+                raise KeyboardInterrupt
+
+    def interrupt(self, signum=None, frame=None):
+        self.interrupted = True
+        self.countdown = 1
+
+    def __len__(self):
+        return len(self.trace)
+
+    def __getitem__(self, index):
+        return self.trace[index]
+
+    def __iter__(self):
+        return iter(self.trace)
+
+
+if __name__ == '__main__':
+    import sys
+
+    # Run (or, given a checkpoint, resume) the 5x6 search, which takes a
+    # while from the corner: interrupt it with Ctrl-C and run again
+    if len(sys.argv) > 1 and os.path.exists(sys.argv[1]):
+        kt = resume(sys.argv[1], trace='off')
+    else:
+        kt = KnightsTour(5, 6, trace='off', checkpointFile='5x6.ckpt')
+    kt.solve()
+    kt.printSolution()
@@ -0,0 +1,354 @@
+from array import array
+from functools import lru_cache
+from knightstour import (KNIGHT_MOVES, KnightsTour, closedTourExists,
+                         neighbourTable)
+
+
+# Sizes of the odd block on a side of odd length
+ODD_BLOCKS = (5, 7, 9, 11, 13)
+
+
+def _isKnightMove(rowA, colA, rowB, colB):
+    return {abs(rowA - rowB), abs(colA - colB)} == {1, 2}
+
+
+@lru_cache(maxsize=None)
+def _closedBaseTour(rows, cols):
+    '''
+    A closed tour of a small rows x cols block, as a tuple of flat cell ids.
+    Found once per block size by a backtracking search for a path from
+    the corner through one of its two neighbours that ends on the other
+    '''
+    if rows > cols:
+        # The search is much faster with the short side first
+        path = _closedBaseTour(cols, rows)
+        return tuple(cell % rows * cols + cell // rows for cell in path)
+    neighbours = neighbourTable(rows, cols, KNIGHT_MOVES)
+    total = rows * cols
+    first, last = neighbours[0]
+    visited = [False] * total
+    degrees = [len(candidates) for candidates in neighbours]
+
+    def mark(currCell, value):
+        visited[currCell] = value
+        for newCell in neighbours[currCell]:
+            degrees[newCell] += -1 if value else 1
+
+    def stranded(currCell):
+        # Every unvisited cell needs a way in and a way out, where the
+        # current cell counts as a way in. The last cell is already
+        # joined to the corner
+        for cell in range(total):
+            if not visited[cell]:
+                exits = degrees[cell] + (cell in neighbours[currCell])
+                if exits < (1 if cell == last else 2):
+                    return True
+        return False
+
+    def ordered(currCell):
+        return sorted((newCell for newCell in neighbours[currCell]
+                       if not visited[newCell] and newCell != last),
+                      key=lambda newCell: degrees[newCell])
+
+    mark(0, True)
+    mark(first, True)
+    path = [0, first]
+    stack = [ordered(first)]
+    while len(path) < total - 1 or last not in neighbours[path[-1]]:
+        if len(path) < total - 1 and stack[-1]:
+            newCell = stack[-1].pop(0)
+            mark(newCell, True)
+            if stranded(newCell):
+                mark(newCell, False)
+                continue
+            path.append(newCell)
+            stack.append(ordered(newCell))
+            continue
+        # Dead end, or a full path that does not close: backtrack
+        stack.pop()
+        mark(path.pop(), False)
+    return tuple(path) + (last,)
+
+
+@lru_cache(maxsize=None)
+def _openBaseTour(rows, cols, startRow, startCol):
+    '''
+    An open tour of a small rows x cols block from startRow, startCol, as a
+    tuple of flat cell ids, or None if the Warnsdorff search gives up with
+    every rotation of the move order
+    '''
+    for shift in range(len(KNIGHT_MOVES)):
+        kt = KnightsTour(rows, cols, startRow, startCol,
+                         strategy='warnsdorff')
+        kt.possibleMoves = list(KNIGHT_MOVES[shift:] + KNIGHT_MOVES[:shift])
+        board = kt.solve()
+        if board is not None:
+            break
+    else:
+        return None
+    path = [0] * (rows * cols)
+    for i in range(rows):
+        for j in range(cols):
+            path[board[i][j]] = i * cols + j
+    return tuple(path)
+
+
+def _splitEven(length):
+    '''
+    Cut an even length of at least 6 into blocks of 6, 8 and 10
+    '''
+    blocks, rest = divmod(length, 8)
+    if rest == 0:
+        return [8] * blocks
+    if rest == 2:
+        return [8] * (blocks - 1) + [10]
+    if rest == 4:
+        return [8] * (blocks - 1) + [6, 6]
+    return [8] * blocks + [6]
+
+
+def _canSplitEven(length):
+    return length == 0 or length >= 6 and length % 2 == 0
+
+
+def _splitSide(length, start):
+    '''
+    The ways of cutting one side of the board into blocks of 6, 8 and 10
+    plus, when the side is odd, one block of an ODD_BLOCKS size that
+    contains the start index. Yields the list of block sizes and the index
+    of the odd block (None if every block is even)
+    '''
+    if length % 2 == 0:
+        yield _splitEven(length), None
+        return
+    for before in range(start - start % 2, -1, -2):
+        if not _canSplitEven(before):
+            continue
+        for size in ODD_BLOCKS:
+            after = length - before - size
+            if before + size > start and _canSplitEven(after):
+                head = _splitEven(before) if before else []
+                tail = _splitEven(after) if after else []
+                yield head + [size] + tail, len(head)
+
+
+def _layout(rows, cols, startRow, startCol):
+    '''
+    Cut the board into blocks. Returns the block sizes along each side and,
+    on boards with two odd sides, the position and open base tour of the
+    odd block, which must start from the start square
+    '''
+    for rowBlocks, oddRow in _splitSide(rows, startRow):
+        for colBlocks, oddCol in _splitSide(cols, startCol):
+            if oddRow is None or oddCol is None:
+                return rowBlocks, colBlocks, None, None
+            top, left = sum(rowBlocks[:oddRow]), sum(colBlocks[:oddCol])
+            path = _openBaseTour(rowBlocks[oddRow], colBlocks[oddCol],
+                                 startRow - top, startCol - left)
+            if path is not None:
+                return rowBlocks, colBlocks, (oddRow, oddCol), path
+    raise ValueError(f'Cannot cut a {rows}x{cols} board into blocks with '
+                     f'a base tour from row {startRow}, column {startCol}')
+
+
+class ConstructedTour:
+    def __init__(self, rows, cols, startRow=0, startCol=0, closed=False):
+        '''
+        Build a knight's tour of a large board in time and memory linear in
+        rows * cols, by stitching together small precomputed block tours
+
+        The board is cut into blocks of 5 to 13 squares a side. Every block
+        gets a closed base tour, except the block holding the start square
+        on boards with two odd sides, which gets an open one. Neighbouring
+        block tours are joined by swapping one edge of each for two knight's
+        moves across the block boundary
+
+        rows: int, the number of rows of the board, at least 5
+        cols: int, the number of columns of the board, at least 5
+        startRow: int, indicating the starting row of the knight
+        startCol: int, indicating the starting column of the knight
+        closed: bool, require the last square to be a knight's move away
+            from the first
+        '''
+        if min(rows, cols) < 5:
+            raise ValueError('The construction needs both sides of the '
+                             f'board to be at least 5, got {rows}x{cols}')
+        if closed and not closedTourExists(rows, cols):
+            raise ValueError(f'There is no closed tour on a {rows}x{cols} '
+                             'board')
+        if rows * cols % 2 and (startRow + startCol) % 2:
+            raise ValueError(f'There is no tour on a {rows}x{cols} board '
+                             f'from row {startRow}, column {startCol}')
+        self.rows = rows
+        self.cols = cols
+        self.startRow = startRow
+        self.startCol = startCol
+        self.closed = rows * cols % 2 == 0
+        # The two tour neighbours of every cell, -1 at the ends of a path
+        self.links = [array('i', [-1]) * (rows * cols) for _ in range(2)]
+        # The step number of every cell, filled in lazily by getSteps()
+        self.steps = None
+
+        rowBlocks, colBlocks, oddBlock, openPath = _layout(
+            rows, cols, startRow, startCol)
+        rowStarts = [sum(rowBlocks[:i]) for i in range(len(rowBlocks))]
+        colStarts = [sum(colBlocks[:j]) for j in range(len(colBlocks))]
+        for i, top in enumerate(rowStarts):
+            for j, left in enumerate(colStarts):
+                if (i, j) == oddBlock:
+                    self._placeBlock(openPath, top, left, rowBlocks[i],
+                                     colBlocks[j], closed=False)
+                else:
+                    self._placeBlock(_closedBaseTour(rowBlocks[i],
+                                                     colBlocks[j]),
+                                     top, left, rowBlocks[i], colBlocks[j],
+                                     closed=True)
+
+        # Join the blocks of every block row from left to right, then the
+        # block rows from top to bottom along the first block column
+        for i, top in enumerate(rowStarts):
+            for j in range(1, len(colStarts)):
+                self._join((top, top + rowBlocks[i]),
+                           (colStarts[j] - 2, colStarts[j] + 2),
+                           vertical=True)
+        for i in range(1, len(rowStarts)):
+            self._join((rowStarts[i] - 2, rowStarts[i] + 2),
+                       (0, colBlocks[0]), vertical=False)
+
+    def _placeBlock(self, path, top, left, rows, cols, closed):
+        '''
+        Copy the links of a base tour of a rows x cols block into the board,
+        with the block's top-left square at top, left
+        '''
+        first, second = self.links
+        boardCols = self.cols
+        cells = [(top + cell // cols) * boardCols + left + cell % cols
+                 for cell in path]
+        for prevCell, currCell in zip(cells, cells[1:]):
+            second[prevCell] = currCell
+            first[currCell] = prevCell
+        if closed:
+            second[cells[-1]] = cells[0]
+            first[cells[0]] = cells[-1]
+
+    def _join(self, rowRange, colRange, vertical):
+        '''
+        Merge the two tours that meet in the strip rowRange x colRange into
+        one. Looks for a tour edge a1-a2 on one side of the block boundary
+        and b1-b2 on the other such that a1-b1 and a2-b2 are knight's moves,
+        then swaps the first two edges for the last two. Starts from the
+        middle of the boundary, so that joins along different sides of a
+        block use different edges
+        '''
+        cols = self.cols
+        boundary = colRange[0] + 2 if vertical else rowRange[0] + 2
+        lines = range(*rowRange) if vertical else range(*colRange)
+        middle = (lines.start + lines.stop) // 2
+        order = sorted(lines, key=lambda line: abs(line - middle))
+        depths = (boundary - 1, boundary - 2)
+        for line in order:
+            for depth in depths:
+                i, j = (line, depth) if vertical else (depth, line)
+                cellA = i * cols + j
+                for moveRow, moveCol in KNIGHT_MOVES:
+                    newRow, newCol = i + moveRow, j + moveCol
+                    across, along = ((newCol, newRow) if vertical
+                                     else (newRow, newCol))
+                    # Stay inside the block on the other side, so that
+                    # the join never reaches a tour it was not meant for
+                    if not (boundary <= across < boundary + 2 and
+                            along in lines):
+                        continue
+                    cellB = newRow * cols + newCol
+                    if self._swap(cellA, cellB):
+                        return
+        raise RuntimeError('Could not join the block tours around row '
+                           f'{rowRange[0]}, column {colRange[0]}')
+
+    def _swap(self, cellA, cellB):
+        '''
+        Try to replace a tour edge at cellA and one at cellB by the edges
+        cellA-cellB and nextA-nextB. Returns whether it succeeded
+        '''
+        first, second = self.links
+        cols = self.cols
+        for nextA in (first[cellA], second[cellA]):
+            if nextA < 0:
+                continue
+            rowA, colA = divmod(nextA, cols)
+            for nextB in (first[cellB], second[cellB]):
+                if nextB < 0 or not _isKnightMove(rowA, colA,
+                                                  *divmod(nextB, cols)):
+                    continue
+                self._relink(cellA, nextA, cellB)
+                self._relink(nextA, cellA, nextB)
+                self._relink(cellB, nextB, cellA)
+                self._relink(nextB, cellB, nextA)
+                return True
+        return False
+
+    def _relink(self, cell, oldCell, newCell):
+        '''
+        Replace the link from cell to oldCell by a link to newCell
+        '''
+        first, second = self.links
+        if first[cell] == oldCell:
+            first[cell] = newCell
+        else:
+            second[cell] = newCell
+
+    def iterPath(self):
+        '''
+        Yield the (row, col) squares of the tour in order, starting from the
+        start square, without building the board
+        '''
+        first, second = self.links
+        cols = self.cols
+        prevCell, currCell = -1, self.startRow * cols + self.startCol
+        for _ in range(self.rows * self.cols):
+            yield divmod(currCell, cols)
+            nextCell = first[currCell]
+            if nextCell == prevCell or nextCell < 0:
+                nextCell = second[currCell]
+            prevCell, currCell = currCell, nextCell
+
+    def getSteps(self):
+        '''
+        Get the step number of every cell, as a flat array indexed by
+        row * cols + col
+        '''
+        if self.steps is None:
+            self.steps = array('i', [0]) * (self.rows * self.cols)
+            cols = self.cols
+            for step, (i, j) in enumerate(self.iterPath()):
+                self.steps[i * cols + j] = step
+        return self.steps
+
+    def iterRows(self):
+        '''
+        Yield the rows of the numbered board one at a time, as arrays
+        '''
+        steps = self.getSteps()
+        for i in range(self.rows):
+            yield steps[i * self.cols:(i + 1) * self.cols]
+
+    def getBoard(self):
+        '''
+        Get the numbered board in the same format KnightsTour.solve()
+        returns, as a list of lists
+        '''
+        return [row.tolist() for row in self.iterRows()]
+
+    def writeBoard(self, file):
+        '''
+        Write the numbered board to a text file object, one row per line
+        '''
+        for row in self.iterRows():
+            file.write(' '.join(map(str, row)))
+            file.write('\n')
+
+
+if __name__ == '__main__':
+    tour = ConstructedTour(12, 12, 0, 0, closed=True)
+    for row in tour.getBoard():
+        print(' '.join(f'{cell:3}' for cell in row))
@@ -0,0 +1,146 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from knightstour import (KNIGHT_MOVES, neighbourTable, stranded,
+                         updateDegrees)
+
+
+def tourPrefixes(rows, cols, startRow, startCol, depth):
+    '''
+    All paths of depth knight's moves from the start square that visit no
+    square twice, as tuples of flat cell ids. Every tour from the start
+    square begins with exactly one of them, so they split the search tree
+    into independent subtrees
+    '''
+    neighbours = neighbourTable(rows, cols, KNIGHT_MOVES)
+    prefixes = [(startRow * cols + startCol,)]
+    for _ in range(min(depth, rows * cols - 1)):
+        prefixes = [prefix + (newCell,) for prefix in prefixes
+                    for newCell in neighbours[prefix[-1]]
+                    if newCell not in prefix]
+    return prefixes
+
+
+def _countSubtree(task):
+    '''
+    Count the tours that begin with a prefix, in a worker process. Uses
+    the pruning helpers of knightstour, which only cut off branches that
+    cannot lead to a tour. Writes every tour found to outFile, one line of
+    flat cell ids per tour, when it is given. Returns the number of tours
+    and of nodes expanded
+    '''
+    rows, cols, prefix, outFile = task
+    total = rows * cols
+    neighbours = neighbourTable(rows, cols, KNIGHT_MOVES)
+    cells = [-1] * total
+    degrees = [len(candidates) for candidates in neighbours]
+    lowCounts = [degrees.count(0), degrees.count(1)]
+    for step, currCell in enumerate(prefix):
+        cells[currCell] = step
+        updateDegrees(cells, degrees, neighbours, currCell, -1, lowCounts)
+
+    tours = nodes = 0
+    out = open(outFile, 'w') if outFile else None
+    path = list(prefix)
+    stack = [[newCell for newCell in neighbours[path[-1]]
+              if cells[newCell] == -1]]
+    if len(path) < total and stranded(cells, degrees, neighbours, path[-1],
+                                      lowCounts):
+        stack[-1] = []
+    while stack:
+        if len(path) == total:
+            tours += 1
+            if out:
+                out.write(' '.join(map(str, path)))
+                out.write('\n')
+        elif stack[-1]:
+            newCell = stack[-1].pop()
+            cells[newCell] = len(path)
+            updateDegrees(cells, degrees, neighbours, newCell, -1,
+                          lowCounts)
+            path.append(newCell)
+            nodes += 1
+            if len(path) < total and stranded(cells, degrees, neighbours,
+                                              newCell, lowCounts):
+                stack.append([])
+            else:
+                stack.append([nextCell for nextCell in neighbours[newCell]
+                              if cells[nextCell] == -1])
+            continue
+        # Every move from the last cell has been tried: backtrack
+        stack.pop()
+        if len(path) > len(prefix):
+            currCell = path.pop()
+            cells[currCell] = -1
+            updateDegrees(cells, degrees, neighbours, currCell, 1,
+                          lowCounts)
+    if out:
+        out.close()
+    return tours, nodes
+
+
+def _runTasks(rows, cols, prefixes, workers, outDir, progress):
+    '''
+    Count the tours below every prefix in a process pool and merge the
+    counts, calling progress(tasksDone, tasksTotal, toursSoFar) as every
+    subtree finishes
+    '''
+    if outDir:
+        os.makedirs(outDir, exist_ok=True)
+    tasks = [
+        (rows, cols, prefix,
+         os.path.join(outDir, f'tours-{index:06d}.txt') if outDir else None)
+        for index, prefix in enumerate(prefixes)
+    ]
+    tours = 0
+    with ProcessPoolExecutor(workers) as pool:
+        futures = [pool.submit(_countSubtree, task) for task in tasks]
+        for done, future in enumerate(as_completed(futures), 1):
+            tours += future.result()[0]
+            if progress:
+                progress(done, len(tasks), tours)
+    return tours
+
+
+def countTours(rows, cols, startRow=0, startCol=0, depth=4, workers=None,
+               outDir=None, progress=None):
+    '''
+    Count every open tour from the start square, splitting the search
+    tree at depth moves and farming the subtrees out to a process pool
+
+    rows: int, the number of rows of the board
+    cols: int, the number of columns of the board
+    startRow: int, indicating the starting row of the knight
+    startCol: int, indicating the starting column of the knight
+    depth: int, the length of the move prefixes the tree is split on;
+        deeper splits give more, smaller tasks
+    workers: int, the number of worker processes (default: one per core)
+    outDir: str, a directory to write the tours to, one file per subtree
+        and one line of flat cell ids (row * cols + col) per tour
+    progress: callable, called as progress(tasksDone, tasksTotal,
+        toursSoFar) whenever a subtree is finished
+    '''
+    prefixes = tourPrefixes(rows, cols, startRow, startCol, depth)
+    return _runTasks(rows, cols, prefixes, workers, outDir, progress)
+
+
+def countAllTours(rows, cols, depth=3, workers=None, outDir=None,
+                  progress=None):
+    '''
+    Count every open tour of the board from every start square, with the
+    subtrees of all start squares in one process pool. Every tour is
+    counted once in each direction. Takes the same options as countTours()
+    '''
+    prefixes = [
+        prefix
+        for startRow in range(rows)
+        for startCol in range(cols)
+        for prefix in tourPrefixes(rows, cols, startRow, startCol, depth)
+    ]
+    return _runTasks(rows, cols, prefixes, workers, outDir, progress)
+
+
+if __name__ == '__main__':
+    def report(done, total, tours):
+        print(f'{done}/{total} subtrees done, {tours} tours so far')
+
+    print(countTours(5, 5, 0, 0, progress=report))
@@ -0,0 +1,314 @@
+import argparse
+import math
+import shutil
+import subprocess
+import numpy as np
+import matplotlib.image as mpimg
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.colors import ListedColormap
+from matplotlib.figure import Figure
+from PIL import Image
+from knightstour import KnightsTour
+from knightstour_visualization_replay import TraceReplay
+
+
+CHESS_PIECE_IMG = 'knight.png'
+BROWN = '#b08974'
+BEIGE = '#ede7df'
+# The bytes of frames a GIF export keeps in memory without max_frames, one
+# byte a pixel: about 570 frames at the default size
+GIF_MEMORY = 128 << 20
+
+
+def _palette():
+    '''
+    A fixed GIF palette: the colours of the board, the text, the crosses
+    and the knight, and the blends between every two of them that
+    antialiasing produces
+    '''
+    colours = [(176, 137, 116), (237, 231, 223), (0, 0, 0),
+               (255, 255, 255), (219, 56, 42)]
+    entries = []
+    for i, first in enumerate(colours):
+        for second in colours[i + 1:]:
+            for k in range(24):
+                entries.append(tuple(round(a + (b - a) * k / 23)
+                                     for a, b in zip(first, second)))
+    palette = Image.new('P', (1, 1))
+    palette.putpalette([value for entry in entries[:256]
+                        for value in entry])
+    return palette
+
+
+class GifWriter:
+    def __init__(self, path, fps):
+        # GIF frames have to be kept until the file is written (Pillow
+        # cannot append to a GIF), so they are kept as palette images, a
+        # quarter of the size of RGBA frames, and export_trace() caps
+        # their number
+        self.path = path
+        self.fps = fps
+        self.frames = []
+        self.palette = _palette()
+
+    def write(self, frame):
+        image = Image.fromarray(frame[:, :, :3])
+        self.frames.append(image.quantize(palette=self.palette,
+                                          dither=Image.Dither.NONE))
+
+    def close(self):
+        if self.frames:
+            self.frames[0].save(self.path, save_all=True,
+                                append_images=self.frames[1:],
+                                duration=1000 / self.fps, loop=0)
+
+
+class FFMpegWriter:
+    def __init__(self, path, fps, size):
+        # Frames are piped to ffmpeg as raw RGBA as they are rendered, so
+        # the length of the video does not matter
+        if shutil.which('ffmpeg') is None:
+            raise RuntimeError('MP4 export needs ffmpeg on the PATH')
+        width, height = size
+        self.process = subprocess.Popen(
+            ['ffmpeg', '-y', '-loglevel', 'error', '-f', 'rawvideo',
+             '-pix_fmt', 'rgba', '-s', f'{width}x{height}', '-r', str(fps),
+             '-i', '-', '-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2',
+             '-pix_fmt', 'yuv420p', path],
+            stdin=subprocess.PIPE
+        )
+
+    def write(self, frame):
+        self.process.stdin.write(frame.tobytes())
+
+    def close(self):
+        self.process.stdin.close()
+        if self.process.wait():
+            raise RuntimeError('ffmpeg failed to write the video')
+
+
+class TraceExporter:
+    def __init__(self, rows, cols, size=6, dpi=80):
+        '''
+        Render the board after any step of a move trace off screen, with
+        the Agg backend and no window. The board and the labels are drawn
+        once; every look of a square (its number, a cross, the knight) is
+        drawn once too, the first time it is needed, and then copied into
+        the frame wherever it appears. A frame only copies the squares
+        that changed since the previous one
+
+        rows: int, the number of rows of the board
+        cols: int, the number of columns of the board
+        size: float, the size of the longer side of the frames in inches
+        dpi: int, the resolution of the frames
+        '''
+        self.rows = rows
+        self.cols = cols
+        # Squares of a whole number of pixels, so that they all look the
+        # same, with room for the labels above and to the left
+        self.cell = max(1, round(size * dpi / (max(rows, cols) + 0.6)))
+        self.margin = round(0.6 * self.cell) if cols <= 26 else 0
+        width = self.margin + cols * self.cell
+        height = self.margin + rows * self.cell
+        self.fig = Figure(figsize=(width / dpi, height / dpi), dpi=dpi)
+        self.canvas = FigureCanvasAgg(self.fig)
+        self.ax = self.fig.add_axes([self.margin / width, 0,
+                                     cols * self.cell / width,
+                                     rows * self.cell / height])
+        self.ax.set_xlim(0, cols)
+        self.ax.set_ylim(rows, 0)
+        fontsize = 0.35 * self.cell * 72 / dpi
+        self._init_board(fontsize)
+
+        # The artists of a square, drawn on a square of either color
+        self.text = self.ax.text(0, 0, '', ha='center', va='center',
+                                 fontsize=fontsize, weight='bold',
+                                 animated=True)
+        self.cross = self.ax.text(0, 0, 'x', ha='center', va='center',
+                                  fontsize=2.5 * fontsize, color='#db382a',
+                                  weight='ultralight', animated=True)
+        self.knight = self.ax.imshow(mpimg.imread(CHESS_PIECE_IMG),
+                                     extent=(0, 1, 1, 0), animated=True)
+        self.reference = [(0, 0), (0, 1) if cols > 1 else (1, 0)]
+        self.tiles = {}
+
+        self.canvas.draw()
+        self.background = self.canvas.copy_from_bbox(self.fig.bbox)
+        self.frame = np.array(self.canvas.buffer_rgba())
+        self.knightCell = None
+
+    def _init_board(self, fontsize):
+        self.ax.set_axis_off()
+        # The squares with alternating colors as a single image
+        checker = np.indices((self.rows, self.cols)).sum(axis=0) % 2
+        self.ax.imshow(checker, cmap=ListedColormap([BROWN, BEIGE]),
+                       extent=(0, self.cols, self.rows, 0),
+                       interpolation='nearest')
+        if self.margin:
+            for i in range(self.rows):
+                self.ax.text(-0.3, i + 0.5, str(self.rows - i),
+                             ha='center', va='center', fontsize=fontsize,
+                             weight='bold')
+            for j in range(self.cols):
+                self.ax.text(j + 0.5, -0.3, chr(65 + j), ha='center',
+                             va='center', fontsize=fontsize, weight='bold')
+
+    @property
+    def size(self):
+        return self.canvas.get_width_height()
+
+    def _pixels(self, x, y):
+        top = self.margin + x * self.cell
+        left = self.margin + y * self.cell
+        return slice(top, top + self.cell), slice(left, left + self.cell)
+
+    def _tile(self, parity, number, crossed, knight):
+        key = (parity, number, crossed, knight)
+        tile = self.tiles.get(key)
+        if tile is None:
+            x, y = self.reference[parity]
+            self.canvas.restore_region(self.background)
+            if knight:
+                self.knight.set_extent((y + 0.1, y + 0.9, x + 0.9, x + 0.1))
+                self.ax.draw_artist(self.knight)
+            if number != -1:
+                self.text.set_position((y + 0.5, x + 0.5))
+                self.text.set_text(str(number))
+                # The number of the knight's square goes on the knight
+                self.text.set_color('white' if knight else 'black')
+                self.ax.draw_artist(self.text)
+            if crossed:
+                self.cross.set_position((y + 0.5, x + 0.5))
+                self.ax.draw_artist(self.cross)
+            buffer = np.asarray(self.canvas.buffer_rgba())
+            tile = self.tiles[key] = buffer[self._pixels(x, y)].copy()
+        return tile
+
+    def _draw_cell(self, replay, cell, knight=False):
+        x, y = divmod(cell, self.cols)
+        number = replay.number[cell]
+        crossed = number != -1 and replay.value[cell] == -1
+        self.frame[self._pixels(x, y)] = self._tile((x + y) % 2, number,
+                                                    crossed, knight)
+
+    def render(self, replay, changed):
+        '''
+        Draw the board at the current step of replay, after seek() reported
+        the changed cells (None: all of them). Returns the frame as an
+        RGBA array of shape (height, width, 4), overwritten by the next
+        call
+        '''
+        if changed is None:
+            changed = range(self.rows * self.cols)
+        current = replay.current()
+        currentCell = None if current is None else \
+            current[0] * self.cols + current[1]
+        if self.knightCell is not None and self.knightCell != currentCell:
+            self._draw_cell(replay, self.knightCell)
+        for cell in changed:
+            if cell != currentCell:
+                self._draw_cell(replay, cell)
+        if currentCell is not None:
+            self._draw_cell(replay, currentCell, knight=True)
+        self.knightCell = currentCell
+        return self.frame
+
+
+def export_trace(moves, rows, cols, path, fps=20, stride=1, max_frames=None,
+                 size=6, dpi=80, progress=None):
+    '''
+    Render a move trace to a GIF or MP4 file (by the extension of path),
+    without a display. One frame is rendered every stride events, and
+    stride is raised so that there are at most max_frames frames; the
+    last frame always shows the whole trace. MP4 frames are streamed to
+    ffmpeg, but GIF frames are kept in memory until the file is written,
+    so without max_frames a GIF gets as many frames as fit in GIF_MEMORY
+
+    moves: sequence of (row, col, step) events as KnightsTour records
+        them, or of (row, col) squares in step order for a solution
+    progress: callable, called as progress(framesDone, framesTotal)
+    Returns the number of frames written
+    '''
+    moves = list(moves)
+    if moves and len(moves[0]) == 2:
+        moves = [(x, y, step) for step, (x, y) in enumerate(moves)]
+
+    exporter = TraceExporter(rows, cols, size, dpi)
+    if path.lower().endswith('.gif'):
+        writer = GifWriter(path, fps)
+        if max_frames is None:
+            width, height = exporter.size
+            max_frames = max(1, GIF_MEMORY // (width * height))
+    elif path.lower().endswith('.mp4'):
+        writer = FFMpegWriter(path, fps, exporter.size)
+    else:
+        raise ValueError(f'Cannot export to {path!r}, expected a .gif or '
+                         '.mp4 file')
+    if max_frames is not None:
+        stride = max(stride, math.ceil(len(moves) / max_frames))
+    steps = list(range(1, len(moves) + 1, stride))
+    if not steps or steps[-1] != len(moves):
+        steps.append(len(moves))
+
+    replay = TraceReplay(moves, rows, cols)
+    try:
+        for done, step in enumerate(steps, 1):
+            writer.write(exporter.render(replay, replay.seek(step)))
+            if progress:
+                progress(done, len(steps))
+    finally:
+        writer.close()
+    return len(steps)
+
+
+def export_process(rows, cols, start_row, start_col, path, **options):
+    '''
+    Solve the knight's tour with backtracking and export the whole search,
+    backtracks included. Takes the options of export_trace()
+    '''
+    kt = KnightsTour(rows, cols, start_row, start_col)
+    kt.solve()
+    return export_trace(kt.getMoves(), rows, cols, path, **options)
+
+
+def export_solution(rows, cols, start_row, start_col, path, **options):
+    '''
+    Solve the knight's tour and export the solution path only. Takes the
+    options of export_trace()
+    '''
+    kt = KnightsTour(rows, cols, start_row, start_col, strategy='warnsdorff')
+    if kt.solve() is None:
+        if kt.status == 'gave up':
+            raise ValueError(f'The search gave up on the {rows}x{cols} '
+                             f'board, starting from row {start_row}, column '
+                             f'{start_col}, before finding a tour')
+        raise ValueError(f'No solution found for {rows}x{cols} board, '
+                         f'starting from row {start_row}, column {start_col}')
+    order = np.argsort(kt.getBoard('numpy'), axis=None)
+    squares = [divmod(cell, cols) for cell in order.tolist()]
+    return export_trace(squares, rows, cols, path, **options)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Export a knight's tour animation without a display")
+    parser.add_argument('mode', choices=['process', 'solution'])
+    parser.add_argument('rows', type=int)
+    parser.add_argument('cols', type=int)
+    parser.add_argument('start_row', type=int)
+    parser.add_argument('start_col', type=int)
+    parser.add_argument('path', help='a .gif or .mp4 file')
+    parser.add_argument('--fps', type=int, default=20)
+    parser.add_argument('--stride', type=int, default=1,
+                        help='render one frame every this many events')
+    parser.add_argument('--max-frames', type=int,
+                        help='default for GIFs: as many as fit in '
+                             f'{GIF_MEMORY >> 20} MB')
+    parser.add_argument('--dpi', type=int, default=80)
+    args = parser.parse_args()
+
+    export = export_process if args.mode == 'process' else export_solution
+    frames = export(args.rows, args.cols, args.start_row, args.start_col,
+                    args.path, fps=args.fps, stride=args.stride,
+                    max_frames=args.max_frames, dpi=args.dpi)
+    print(f'{frames} frames written to {args.path}')
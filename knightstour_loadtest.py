@@ -0,0 +1,149 @@
+import argparse
+import asyncio
+import json
+import random
+import time
+from benchmark import parse_size
+from knightstour_server import SolverService, percentiles
+
+
+def make_requests(count, sizes, duplicates=1, seed=0):
+    '''
+    count solve requests on boards of the given (rows, cols) sizes from
+    random start squares, every distinct request repeated duplicates times
+    in a row, so that the repeats arrive while the first is being solved
+    '''
+    rng = random.Random(seed)
+    requests = []
+    while len(requests) < count:
+        rows, cols = rng.choice(sizes)
+        request = {'rows': rows, 'cols': cols,
+                   'startRow': rng.randrange(rows),
+                   'startCol': rng.randrange(cols)}
+        requests.extend([request] * duplicates)
+    return requests[:count]
+
+
+async def _client(host, port, requests, results, timeout):
+    reader, writer = await asyncio.open_connection(host, port,
+                                                   limit=1 << 24)
+    try:
+        while requests:
+            request = {**requests.pop(), 'timeout': timeout}
+            began = time.perf_counter()
+            writer.write(json.dumps(request).encode() + b'\n')
+            await writer.drain()
+            response = json.loads(await reader.readline())
+            results.append((time.perf_counter() - began, response))
+    finally:
+        writer.close()
+        await writer.wait_closed()
+
+
+async def fetch_metrics(host, port):
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(b'{"op": "metrics"}\n')
+    await writer.drain()
+    metrics = json.loads(await reader.readline())
+    writer.close()
+    await writer.wait_closed()
+    return metrics
+
+
+async def run_load(host, port, requests, concurrency=16, timeout=30.0):
+    '''
+    Send the requests over concurrency connections, each waiting for an
+    answer before its next request. Returns the throughput, the latency
+    percentiles seen by the clients, the count of every status and
+    source (see SolverService.solve), and the server's own metrics
+    '''
+    pending = list(reversed(requests))
+    results = []
+    began = time.perf_counter()
+    await asyncio.gather(*(_client(host, port, pending, results, timeout)
+                           for _ in range(concurrency)))
+    elapsed = time.perf_counter() - began
+    counts = {}
+    for _, response in results:
+        for name in (response['status'], response.get('source')):
+            if name is not None:
+                counts[name] = counts.get(name, 0) + 1
+    return {
+        'requests': len(results),
+        'seconds': elapsed,
+        'throughput': len(results) / elapsed,
+        'latency': percentiles([latency for latency, _ in results]),
+        'counts': counts,
+        'server': await fetch_metrics(host, port),
+    }
+
+
+async def run_local(workers, requests, concurrency, timeout, **options):
+    '''
+    run_load() against a SolverService with the given number of workers,
+    started in this process on a free port
+    '''
+    service = SolverService(workers, **options)
+    server = await service.start(port=0)
+    port = server.sockets[0].getsockname()[1]
+    try:
+        # Start the worker processes before the clock does
+        await asyncio.gather(*(service.solve(5, 5 + i, 0, 0)
+                               for i in range(workers)))
+        return await run_load('127.0.0.1', port, requests, concurrency,
+                              timeout)
+    finally:
+        server.close()
+        await server.wait_closed()
+        service.close()
+
+
+def format_result(label, result):
+    latency = result['latency']
+    counts = ', '.join(f'{name} {count}'
+                       for name, count in sorted(result['counts'].items()))
+    return (f'{label:>10}  {result["throughput"]:8.1f} req/s  '
+            f'p50 {1000 * latency["p50"]:7.1f} ms  '
+            f'p99 {1000 * latency["p99"]:7.1f} ms  '
+            f'queue wait p50 '
+            f'{1000 * result["server"]["queueWait"].get("p50", 0):7.1f} ms'
+            f'  ({counts})')
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Load-test the knight's tour solver service")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--workers', type=int, nargs='+',
+                        help='start a local service with each of these '
+                             'worker counts in turn instead of using '
+                             '--host and --port')
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--sizes', nargs='+', type=parse_size,
+                        default=[(100, 100), (120, 150), (150, 150)])
+    parser.add_argument('--duplicates', type=int, default=1,
+                        help='send every distinct request this many times '
+                             'in a row, to exercise coalescing')
+    parser.add_argument('--timeout', type=float, default=30.0)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    requests = make_requests(args.requests, args.sizes, args.duplicates,
+                             args.seed)
+    if args.workers:
+        # Without a cache, every run solves the same requests afresh
+        for workers in args.workers:
+            result = asyncio.run(run_local(workers, requests,
+                                           args.concurrency, args.timeout,
+                                           cache_size=0))
+            print(format_result(f'{workers} workers', result))
+    else:
+        result = asyncio.run(run_load(args.host, args.port, requests,
+                                      args.concurrency, args.timeout))
+        print(format_result(f'{args.host}:{args.port}', result))
+
+
+if __name__ == '__main__':
+    main()
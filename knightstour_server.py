@@ -0,0 +1,285 @@
+import argparse
+import asyncio
+import json
+import os
+import time
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from knightstour import KnightsTour
+from knightstour_cache import SolutionCache, defaultOptions
+
+
+# The largest side of a board the service solves
+MAX_SIDE = 500
+# The longest boards with a side of 3 or 4 the service solves. The pruned
+# search they get settles every start square of 3x24 and 4x7 within about
+# a second, and leaves some squares of 3x30 and 4x8 unsettled after 5
+# seconds, so longer ones would only hold a worker for the whole
+# solve_timeout. Boards with a side of 1 or 2 have no tour and need no
+# search
+MAX_NARROW_SIDE = {3: 24, 4: 7}
+# The number of recent requests and jobs the latency metrics cover
+WINDOW = 1000
+
+
+def _solve_job(task):
+    '''
+    Solve one request in a worker process. Returns the status, the flat
+    board as int32 bytes (None without a tour) and the wall-clock time the
+    job started at, to measure the time it waited in the queue
+    '''
+    rows, cols, start_row, start_col, options, budget = task
+    started = time.time()
+    kt = KnightsTour(rows, cols, start_row, start_col, trace='off',
+                     **(options or defaultOptions(rows, cols)))
+    kt.solve(timeout=budget)
+    cells = kt.cells.tobytes() if kt.status == 'solved' else None
+    return kt.status, cells, started
+
+
+def percentiles(values):
+    '''
+    The median, 95th and 99th percentiles and the maximum of values
+    '''
+    if not values:
+        return {}
+    ordered = sorted(values)
+    last = len(ordered) - 1
+    return {
+        'p50': ordered[round(0.50 * last)],
+        'p95': ordered[round(0.95 * last)],
+        'p99': ordered[round(0.99 * last)],
+        'max': ordered[last],
+    }
+
+
+class SolverService:
+    def __init__(self, workers=None, timeout=10.0, solve_timeout=60.0,
+                 cache_size=256, cache_path=None, **options):
+        '''
+        Solve knight's tour requests from an asyncio event loop in a pool
+        of worker processes. A request for a board that is being solved
+        waits on that job instead of starting another, solved boards are
+        kept in a SolutionCache, and every request gets its answer or
+        'timeout' within its timeout, while the job carries on for the
+        requests after it
+
+        workers: int, the number of worker processes (default: one per core)
+        timeout: float, the default number of seconds a request waits
+        solve_timeout: float, the search budget of a job, after which its
+            requests get 'exhausted' and nothing is cached
+        cache_size: int, the number of boards kept in memory (0: none)
+        cache_path: str, an sqlite database keeping the boards across runs
+        options: passed on to KnightsTour (default: see
+            knightstour_cache.defaultOptions)
+        '''
+        self.workers = workers or os.cpu_count()
+        self.timeout = timeout
+        self.solve_timeout = solve_timeout
+        self.options = options
+        self.pool = ProcessPoolExecutor(self.workers)
+        self.cache = None
+        if cache_size or cache_path is not None:
+            self.cache = SolutionCache(cache_path, cache_size)
+        # The running job of every board being solved
+        self.jobs = {}
+        self.waiting = 0
+        self.counts = dict.fromkeys(['requests', 'cached', 'coalesced',
+                                     'solves', 'timeouts', 'errors'], 0)
+        self.latencies = deque(maxlen=WINDOW)
+        self.queue_waits = deque(maxlen=WINDOW)
+        self.started = time.perf_counter()
+
+    async def solve(self, rows, cols, start_row, start_col, timeout=None):
+        '''
+        Answer one request. Returns a dict with the status ('solved',
+        'no tour', 'gave up', 'exhausted' or 'timeout'), the board (a list
+        of rows, or None) and its source: 'classify' for a board with no
+        tour from the start square, 'cache', 'coalesced' onto a running
+        job, or 'job' for a new one
+        '''
+        key = (rows, cols, start_row, start_col)
+        kt = KnightsTour(rows, cols, start_row, start_col, trace='off')
+        if kt.classify() == 'impossible':
+            return {'status': 'no tour', 'board': None, 'source': 'classify'}
+        if self.cache is not None:
+            found, board = self.cache.peek(*key)
+            if found:
+                self.counts['cached'] += 1
+                return {'status': 'solved' if board else 'no tour',
+                        'board': board, 'source': 'cache'}
+
+        job = self.jobs.get(key)
+        if job is None:
+            source = 'job'
+            job = self.jobs[key] = asyncio.ensure_future(self._run(key))
+            job.add_done_callback(lambda job: self.jobs.pop(key, None))
+        else:
+            source = 'coalesced'
+            self.counts['coalesced'] += 1
+        try:
+            # Shielded, so that a request timing out leaves the job to the
+            # others waiting on it
+            status, board = await asyncio.wait_for(
+                asyncio.shield(job), timeout or self.timeout)
+        except asyncio.TimeoutError:
+            self.counts['timeouts'] += 1
+            return {'status': 'timeout', 'board': None, 'source': source}
+        return {'status': status, 'board': board, 'source': source}
+
+    async def _run(self, key):
+        rows, cols = key[:2]
+        loop = asyncio.get_running_loop()
+        submitted = time.time()
+        self.counts['solves'] += 1
+        status, cells, started = await loop.run_in_executor(
+            self.pool, _solve_job,
+            key + (self.options, self.solve_timeout))
+        self.queue_waits.append(max(0.0, started - submitted))
+        board = None
+        if cells is not None:
+            cells = array('i', cells)
+            board = [cells[i:i + cols].tolist()
+                     for i in range(0, len(cells), cols)]
+        if self.cache is not None and status in ('solved', 'no tour'):
+            self.cache.put(*key, board)
+        return status, board
+
+    def metrics(self):
+        '''
+        The counters of the service, the jobs running and queued, and the
+        latency of the last WINDOW requests and queue wait of the last
+        WINDOW jobs, in seconds
+        '''
+        return {
+            **self.counts,
+            'workers': self.workers,
+            'waiting': self.waiting,
+            'jobs': len(self.jobs),
+            'queueDepth': max(0, len(self.jobs) - self.workers),
+            'cacheSize': len(self.cache.boards) if self.cache else 0,
+            'latency': percentiles(self.latencies),
+            'queueWait': percentiles(self.queue_waits),
+            'uptime': time.perf_counter() - self.started,
+        }
+
+    async def handle(self, request):
+        '''
+        Answer one decoded request: {"op": "metrics"}, or a solve request
+        {"rows", "cols", "startRow", "startCol", "timeout"}. Its "id", if
+        any, is sent back with the answer
+        '''
+        if request.get('op') == 'metrics':
+            return {'id': request.get('id'), **self.metrics()}
+        began = time.perf_counter()
+        self.counts['requests'] += 1
+        self.waiting += 1
+        try:
+            rows, cols = int(request['rows']), int(request['cols'])
+            start_row = int(request.get('startRow', 0))
+            start_col = int(request.get('startCol', 0))
+            if not (0 < rows <= MAX_SIDE and 0 < cols <= MAX_SIDE
+                    and 0 <= start_row < rows and 0 <= start_col < cols):
+                raise ValueError(f'No {rows}x{cols} board with a start '
+                                 f'square at row {start_row}, column '
+                                 f'{start_col} (sides up to {MAX_SIDE})')
+            short, long = sorted((rows, cols))
+            if long > MAX_NARROW_SIDE.get(short, MAX_SIDE):
+                raise ValueError(f'Boards with a side of {short} are only '
+                                 f'solved up to {short}x'
+                                 f'{MAX_NARROW_SIDE[short]}')
+            response = await self.solve(rows, cols, start_row, start_col,
+                                        request.get('timeout'))
+        except Exception as error:
+            # Bad requests, and jobs that failed in their worker
+            self.counts['errors'] += 1
+            response = {'status': 'error', 'error': str(error)}
+        finally:
+            self.waiting -= 1
+        latency = time.perf_counter() - began
+        self.latencies.append(latency)
+        return {'id': request.get('id'), **response, 'latency': latency}
+
+    async def _answer(self, line, writer):
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError('A request is a JSON object')
+        except ValueError as error:
+            self.counts['errors'] += 1
+            response = {'status': 'error', 'error': str(error)}
+        else:
+            response = await self.handle(request)
+        if not writer.is_closing():
+            writer.write(json.dumps(response).encode() + b'\n')
+            await writer.drain()
+
+    async def serve_client(self, reader, writer):
+        '''
+        Serve one connection: a JSON request per line, answered with a
+        JSON line each as they are done, so requests can be pipelined
+        '''
+        answers = set()
+        try:
+            while line := await reader.readline():
+                if line.strip():
+                    answer = asyncio.ensure_future(self._answer(line, writer))
+                    answers.add(answer)
+                    answer.add_done_callback(answers.discard)
+            if answers:
+                await asyncio.wait(answers)
+        except (ConnectionError, asyncio.CancelledError):
+            # The client went away, or the service is shutting down
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host='127.0.0.1', port=8765):
+        '''
+        Listen for connections. Returns the asyncio server (port 0 picks a
+        free port, see server.sockets)
+        '''
+        return await asyncio.start_server(self.serve_client, host, port,
+                                          limit=1 << 20)
+
+    def close(self):
+        self.pool.shutdown(cancel_futures=True)
+        if self.cache is not None:
+            self.cache.close()
+
+
+async def serve(host, port, **options):
+    service = SolverService(**options)
+    server = await service.start(host, port)
+    print(f'Serving on {host}:{server.sockets[0].getsockname()[1]} '
+          f'with {service.workers} workers')
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Serve knight's tour solves as line-delimited JSON")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--timeout', type=float, default=10.0,
+                        help='seconds a request waits for its answer')
+    parser.add_argument('--solve-timeout', type=float, default=60.0,
+                        help='search budget of a job in seconds')
+    parser.add_argument('--cache-size', type=int, default=256)
+    parser.add_argument('--cache-path')
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(serve(args.host, args.port, workers=args.workers,
+                          timeout=args.timeout,
+                          solve_timeout=args.solve_timeout,
+                          cache_size=args.cache_size,
+                          cache_path=args.cache_path))
+    except KeyboardInterrupt:
+        pass
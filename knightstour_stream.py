@@ -0,0 +1,85 @@
+import queue
+import threading
+
+
+class BackgroundSolver:
+    def __init__(self, tour, maxsize=4096, timeout=None, maxNodes=None):
+        '''
+        Run tour.solve_iter() in a background thread that pushes its
+        (row, col, step) events into a bounded queue. The search is paused
+        whenever the queue is full, so it only runs maxsize events ahead of
+        the reader and memory stays bounded however long it runs. cancel()
+        stops it, leaving the partial tour on the board
+
+        timeout, maxNodes: the search budgets of solve()
+        '''
+        self.tour = tour
+        self.timeout = timeout
+        self.maxNodes = maxNodes
+        self.events = queue.Queue(maxsize)
+        self.cancelled = threading.Event()
+        self.finished = threading.Event()
+        self.error = None
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def _run(self):
+        search = self.tour.solve_iter(self.timeout, self.maxNodes)
+        try:
+            for event in search:
+                # Wait for room in the queue, but give up on a cancel
+                while not self.cancelled.is_set():
+                    try:
+                        self.events.put(event, timeout=0.1)
+                        break
+                    except queue.Full:
+                        pass
+                if self.cancelled.is_set():
+                    break
+        except Exception as error:
+            self.error = error
+        finally:
+            search.close()
+            self.finished.set()
+
+    def take(self, count):
+        '''
+        Take up to count events that have arrived, without waiting
+        '''
+        events = []
+        while len(events) < count:
+            try:
+                events.append(self.events.get_nowait())
+            except queue.Empty:
+                break
+        return events
+
+    def cancel(self, wait=True):
+        '''
+        Stop the search at its next event
+        '''
+        self.cancelled.set()
+        if wait:
+            self.thread.join()
+
+    @property
+    def done(self):
+        '''
+        True once the search is over and every event has been taken
+        '''
+        return self.finished.is_set() and self.events.empty()
+
+    @property
+    def status(self):
+        '''
+        'searching', 'cancelled', or once the search is over the status of
+        the tour ('solved', 'no tour', 'gave up' or 'exhausted')
+        '''
+        if not self.finished.is_set():
+            return 'searching'
+        if self.cancelled.is_set() and self.tour.status is None:
+            return 'cancelled'
+        return self.tour.status
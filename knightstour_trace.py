@@ -0,0 +1,307 @@
+import struct
+import time
+from array import array
+from collections.abc import Sequence
+
+
+TRACE_MAGIC = b'KTTR'
+TRACE_VERSION = 1
+# magic, version, bytes per field, number of possible moves, rows, cols,
+# startRow, startCol, events between keyframes; followed by the possible
+# moves as int8 pairs and padding up to a multiple of 8 bytes
+TRACE_HEADER = struct.Struct('<4sHBBIIIII')
+
+
+def traceHeaderSize(moveCount):
+    return (TRACE_HEADER.size + 2 * moveCount + 7) // 8 * 8
+
+
+class NullTrace(Sequence):
+    '''
+    A move trace that records nothing, for searches nobody visualizes
+    '''
+    def append(self, move):
+        pass
+
+    def __len__(self):
+        return 0
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return []
+        raise IndexError('the move trace is turned off')
+
+
+class CountTrace(NullTrace):
+    '''
+    A move trace that only counts the placements and backtracks
+    '''
+    def __init__(self):
+        self.placements = 0
+        self.backtracks = 0
+
+    def append(self, move):
+        if move[2] == -1:
+            self.backtracks += 1
+        else:
+            self.placements += 1
+
+    @property
+    def events(self):
+        return self.placements + self.backtracks
+
+
+class PackedTrace(Sequence):
+    # Number of records read from the spill file at a time when iterating
+    CHUNK = 1 << 16
+
+    def __init__(self, cols, limit=None, spillPath=None):
+        '''
+        A move trace packed into an int array, two ints per move: the flat
+        cell id (row * cols + col) and the step, -1 for a backtrack. It
+        reads back as the usual sequence of (row, col, step) tuples
+
+        cols: int, the number of columns of the board
+        limit: int, the number of moves held in memory. Without spillPath
+            the moves past the limit are only counted, in dropped
+        spillPath: str, a file the moves held in memory are appended to
+            whenever there are limit of them, so that a trace of any
+            length takes constant memory
+        '''
+        self.cols = cols
+        self.limit = limit
+        self.records = array('i')
+        # The number of moves in the spill file and the number not kept
+        self.spilled = 0
+        self.dropped = 0
+        self.spillFile = None
+        if spillPath is not None:
+            if limit is None:
+                raise ValueError('A spill file needs a limit on the moves '
+                                 'held in memory')
+            self.spillFile = open(spillPath, 'w+b')
+
+    def append(self, move):
+        row, col, step = move
+        records = self.records
+        if self.limit is not None and len(records) >= 2 * self.limit:
+            if self.spillFile is None:
+                self.dropped += 1
+                return
+            self.spillFile.seek(0, 2)
+            records.tofile(self.spillFile)
+            self.spilled += len(records) // 2
+            del records[:]
+        records.append(row * self.cols + col)
+        records.append(step)
+
+    def close(self):
+        '''
+        Close the spill file, after which the spilled moves can no longer
+        be read
+        '''
+        if self.spillFile is not None:
+            self.spillFile.close()
+
+    def __len__(self):
+        return self.spilled + len(self.records) // 2
+
+    def _readSpilled(self, start, count):
+        records = array('i')
+        self.spillFile.seek(start * 2 * records.itemsize)
+        records.frombytes(self.spillFile.read(count * 2 * records.itemsize))
+        return records
+
+    def _unpack(self, records):
+        cols = self.cols
+        for i in range(0, len(records), 2):
+            yield (records[i] // cols, records[i] % cols, records[i + 1])
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('move index out of range')
+        if index < self.spilled:
+            records = self._readSpilled(index, 1)
+        else:
+            offset = 2 * (index - self.spilled)
+            records = self.records[offset:offset + 2]
+        return next(self._unpack(records))
+
+    def __iter__(self):
+        for start in range(0, self.spilled, self.CHUNK):
+            count = min(self.CHUNK, self.spilled - start)
+            yield from self._unpack(self._readSpilled(start, count))
+        yield from self._unpack(self.records)
+
+
+class InstrumentedTrace(Sequence):
+    def __init__(self, trace, total, sampleInterval=0, onSample=None):
+        '''
+        A move trace that keeps search counters as the moves go by, and
+        passes them on to another trace. It reads back like that trace
+
+        trace: the trace the moves are recorded in
+        total: int, the number of squares, the depth of a complete tour
+        sampleInterval: int, call onSample every this many nodes
+        onSample: callable, called as onSample(instrumentedTrace)
+        '''
+        self.trace = trace
+        self.total = total
+        self.sampleInterval = sampleInterval if onSample else 0
+        self.onSample = onSample
+        self.nodes = 0
+        self.backtracks = 0
+        self.depth = 0
+        self.maxDepth = 0
+        self.backtracksByDepth = [0] * total
+        self.startTime = time.perf_counter()
+        self.firstSolutionTime = None
+
+    def start(self):
+        '''
+        Restart the clock that the time to the first solution is taken on
+        '''
+        self.startTime = time.perf_counter()
+
+    def append(self, move):
+        step = move[2]
+        if step == -1:
+            self.backtracks += 1
+            self.backtracksByDepth[self.depth] += 1
+            self.depth -= 1
+        else:
+            self.depth = step
+            if step:
+                self.nodes += 1
+                if step > self.maxDepth:
+                    self.maxDepth = step
+                    if (step == self.total - 1
+                            and self.firstSolutionTime is None):
+                        self.firstSolutionTime = (time.perf_counter() -
+                                                  self.startTime)
+                if (self.sampleInterval
+                        and self.nodes % self.sampleInterval == 0):
+                    self.onSample(self)
+        self.trace.append(move)
+
+    def snapshot(self):
+        '''
+        The counters as a dict: nodes expanded, backtracks, maxDepth
+        reached, backtracksByDepth (entry d counts the backtracks out of
+        depth d), firstSolutionTime (seconds, None until a tour is found)
+        and elapsed seconds
+        '''
+        return {
+            'nodes': self.nodes,
+            'backtracks': self.backtracks,
+            'maxDepth': self.maxDepth,
+            'backtracksByDepth': self.backtracksByDepth[:],
+            'firstSolutionTime': self.firstSolutionTime,
+            'elapsed': time.perf_counter() - self.startTime,
+        }
+
+    def __len__(self):
+        return len(self.trace)
+
+    def __getitem__(self, index):
+        return self.trace[index]
+
+    def __iter__(self):
+        return iter(self.trace)
+
+
+class BinaryTrace(Sequence):
+    def __init__(self, tour, path, keyframeInterval=65536):
+        '''
+        A move trace written to a binary file as it is recorded, for
+        knightstour_tracefile.TraceFile to read back at random. Every move
+        is a fixed-width record of two fields, the flat cell id and the
+        step (-1 for a backtrack), int16 on boards of fewer than 32768
+        squares and int32 otherwise. The file starts with a header (the
+        board size, the start square and the move ordering of tour), and
+        every keyframeInterval moves are followed by a keyframe, the number
+        and the value of every cell after them (see TraceReplay), so that
+        the board after any move can be rebuilt from the last keyframe
+
+        Moves are buffered and written a keyframe interval at a time;
+        flush() writes the rest. It reads back as the usual sequence of
+        (row, col, step) tuples
+        '''
+        self.tour = tour
+        self.path = path
+        self.cols = tour.cols
+        self.keyframeInterval = keyframeInterval
+        total = tour.rows * tour.cols
+        self.typecode = 'h' if total <= 0x7fff else 'i'
+        self.records = array(self.typecode)
+        self.number = array(self.typecode, [-1]) * total
+        self.value = array(self.typecode, [-1]) * total
+        self.count = 0
+        self.file = open(path, 'wb')
+        self.headerWritten = False
+        self.reader = None
+
+    def append(self, move):
+        row, col, step = move
+        cell = row * self.cols + col
+        self.records.append(cell)
+        self.records.append(step)
+        if step != -1:
+            self.number[cell] = step
+        self.value[cell] = step
+        self.count += 1
+        if not self.count % self.keyframeInterval:
+            self._write()
+            self.number.tofile(self.file)
+            self.value.tofile(self.file)
+
+    def _write(self):
+        if not self.headerWritten:
+            # Written with the first moves, so that the move ordering is
+            # the one the search used
+            tour = self.tour
+            moves = tour.possibleMoves
+            header = TRACE_HEADER.pack(
+                TRACE_MAGIC, TRACE_VERSION, self.records.itemsize,
+                len(moves), tour.rows, tour.cols, tour.startRow,
+                tour.startCol, self.keyframeInterval)
+            header += array('b', [offset for move in moves
+                                  for offset in move]).tobytes()
+            self.file.write(header.ljust(traceHeaderSize(len(moves)),
+                                         b'\0'))
+            self.headerWritten = True
+        self.records.tofile(self.file)
+        del self.records[:]
+
+    def flush(self):
+        '''
+        Write the buffered moves, so that the file holds the whole trace
+        '''
+        if not self.file.closed:
+            self._write()
+            self.file.flush()
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+    def _reader(self):
+        from knightstour_tracefile import TraceFile
+
+        self.flush()
+        if self.reader is None or len(self.reader) != self.count:
+            self.reader = TraceFile(self.path)
+        return self.reader
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        return self._reader()[index]
+
+    def __iter__(self):
+        return iter(self._reader())
@@ -0,0 +1,160 @@
+import mmap
+import struct
+from collections.abc import Sequence
+import numpy as np
+from knightstour_trace import (TRACE_HEADER, TRACE_MAGIC, TRACE_VERSION,
+                               traceHeaderSize)
+
+
+class TraceFile(Sequence):
+    # Number of moves unpacked at a time when iterating
+    CHUNK = 1 << 16
+
+    def __init__(self, path):
+        '''
+        Read a trace file written by knightstour_trace.BinaryTrace through
+        a memory map, so that a trace of any size opens at once and only
+        the pages read are loaded. It reads as the usual sequence of
+        (row, col, step) tuples, with O(1) access to any move, and
+        stateAt() rebuilds the board after any move from the keyframe
+        before it. A file cut short, by a search still running or killed,
+        reads up to its last whole move
+        '''
+        self.path = path
+        with open(path, 'rb') as f:
+            if not f.seek(0, 2):
+                raise ValueError(f'{path} is empty')
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, itemsize, moveCount, self.rows, self.cols,
+         self.startRow, self.startCol,
+         self.keyframeInterval) = TRACE_HEADER.unpack_from(self.map)
+        if magic != TRACE_MAGIC or version != TRACE_VERSION:
+            raise ValueError(f'{path} is not a knight\'s tour trace file')
+        offsets = struct.unpack_from(f'<{2 * moveCount}b', self.map,
+                                     TRACE_HEADER.size)
+        self.possibleMoves = list(zip(offsets[::2], offsets[1::2]))
+
+        self.dtype = np.dtype(f'<i{itemsize}')
+        self.record = struct.Struct('<hh' if itemsize == 2 else '<ii')
+        self.headerSize = traceHeaderSize(moveCount)
+        self.keyframeSize = 2 * self.rows * self.cols * itemsize
+        self.blockSize = (self.keyframeInterval * self.record.size +
+                          self.keyframeSize)
+        # Whole blocks of moves and their keyframe, then the moves since
+        blocks, tail = divmod(len(self.map) - self.headerSize,
+                              self.blockSize)
+        self.keyframes = blocks
+        self.count = (blocks * self.keyframeInterval +
+                      min(tail // self.record.size, self.keyframeInterval))
+
+    def close(self):
+        self.map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.count
+
+    def _offset(self, index):
+        block, index = divmod(index, self.keyframeInterval)
+        return (self.headerSize + block * self.blockSize +
+                index * self.record.size)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('move index out of range')
+        cell, step = self.record.unpack_from(self.map, self._offset(index))
+        return (cell // self.cols, cell % self.cols, step)
+
+    def records(self, start, stop):
+        '''
+        The moves start to stop as an int array of shape (n, 2), the flat
+        cell id and the step of every move, read straight off the map
+        '''
+        stop = min(stop, len(self))
+        parts = []
+        while start < stop:
+            count = min(stop, (start // self.keyframeInterval + 1) *
+                        self.keyframeInterval) - start
+            parts.append(np.frombuffer(self.map, self.dtype, 2 * count,
+                                       self._offset(start)))
+            start += count
+        if not parts:
+            return np.empty((0, 2), dtype=self.dtype)
+        return np.concatenate(parts).reshape(-1, 2)
+
+    def __iter__(self):
+        cols = self.cols
+        for start in range(0, len(self), self.CHUNK):
+            for cell, step in self.records(start, start + self.CHUNK).tolist():
+                yield (cell // cols, cell % cols, step)
+
+    def keyframe(self, index):
+        '''
+        The number and the value of every cell (see TraceReplay) after the
+        first index * keyframeInterval moves, as two flat int32 arrays
+        '''
+        total = self.rows * self.cols
+        if index == 0:
+            return (np.full(total, -1, dtype=np.int32),
+                    np.full(total, -1, dtype=np.int32))
+        offset = (self.headerSize + index * self.blockSize -
+                  self.keyframeSize)
+        frame = np.frombuffer(self.map, self.dtype, 2 * total, offset)
+        return (frame[:total].astype(np.int32),
+                frame[total:].astype(np.int32))
+
+    def stateAt(self, step):
+        '''
+        The number and the value of every cell after the first step moves,
+        from the keyframe before them and at most keyframeInterval moves
+        '''
+        step = max(0, min(step, len(self)))
+        index = min(step // self.keyframeInterval, self.keyframes)
+        number, value = self.keyframe(index)
+        records = self.records(index * self.keyframeInterval, step)
+        cells = records[:, 0].astype(np.intp)
+        steps = records[:, 1]
+        # The last move on every cell gives its value, and its last
+        # placement its number
+        last, where = np.unique(cells[::-1], return_index=True)
+        value[last] = steps[::-1][where]
+        placed = steps != -1
+        last, where = np.unique(cells[placed][::-1], return_index=True)
+        number[last] = steps[placed][::-1][where]
+        return number, value
+
+    def boardAt(self, step):
+        '''
+        The board after the first step moves, as an int32 array of shape
+        (rows, cols) with -1 on the unvisited squares
+        '''
+        return self.stateAt(step)[1].reshape(self.rows, self.cols)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description='Summarize a binary knight\'s tour trace file')
+    parser.add_argument('path')
+    parser.add_argument('--at', type=int,
+                        help='print the board after this many moves')
+    args = parser.parse_args()
+
+    with TraceFile(args.path) as trace:
+        print(f'{trace.rows}x{trace.cols} board from row {trace.startRow}, '
+              f'column {trace.startCol}, moves {trace.possibleMoves}')
+        print(f'{len(trace)} moves, {trace.keyframes} keyframes every '
+              f'{trace.keyframeInterval} moves')
+        if args.at is not None:
+            for row in trace.boardAt(args.at).tolist():
+                print(' '.join(str(cell) for cell in row))
@@ -2,65 +2,169 @@ from knightstour_visualization_solution import KTVisualization
 import matplotlib.pyplot as plt
 from matplotlib.widgets import Button
 from knightstour import KnightsTour
-import matplotlib.image as mpimg
+from knightstour_stream import BackgroundSolver
+from knightstour_tracefile import TraceFile
+from knightstour_visualization_replay import TraceFileReplay, TraceReplay
 from matplotlib.offsetbox import OffsetImage, AnnotationBbox
 
 
 class KTVisualizationProcess(KTVisualization):
-    def __init__(self, rows, cols, start_row, start_col):
-        super().__init__(rows, cols, start_row, start_col)
-
-    def _update(self, moves):
-        self.chessboard.fill(-1)
-        # Remove the existing imagebox if it exists
-        for artist in self.ax.artists:
-            artist.remove()
-
-        for i in range(self.rows):
-            for j in range(self.cols):
-                self.texts[i][j].set_text('')
-
-        for i, (x, y, pos) in enumerate(moves[:self.step]):
-            # show the chess piece
-            if pos != -1:
-                self.chessboard[x, y] = pos
-                self.texts[x][y].set_text(str(pos))
-                self.remove_symbols[x][y].set_text('')
-                if i == self.step - 1:
-                    # show the image
-                    img = mpimg.imread(self.CHESS_PIECE_IMG)
-                    imagebox = OffsetImage(img, zoom=0.12)
-                    ab = AnnotationBbox(imagebox, (y + 0.5, x + 0.5),
-                                        frameon=False)
-                    self.ax.add_artist(ab)
-                    # adjust the style and position of text to match the image
-                    self.texts[x][y].set_color('white')
-                    self.texts[x][y].set_zorder(10)
-                    self.texts[x][y].set_position((y + 0.47, x + 0.66))
-                else:
-                    # reset the style and position of text
-                    self.texts[x][y].set_color('black')
-                    self.texts[x][y].set_position((y + 0.5, x + 0.5))
-            else:
-                # reset the cell during backtracking
-                self.chessboard[x, y] = -1
-                self.remove_symbols[x][y].set_text('x')
-                self.remove_symbols[x][y].set_zorder(10)
-        self.fig.canvas.draw_idle()
-
-    def _store_moves(self):
-        kt = KnightsTour(self.rows, self.cols, self.start_row, self.start_col)
-        kt.solve()
-        self.moves = kt.getMoves()
+    def __init__(self, rows, cols, start_row, start_col, scalable=None):
+        super().__init__(rows, cols, start_row, start_col, scalable)
+        self.knight_square = None
+        self.solver = None
+        self.timer = None
+        self.playing = True
+        self.speed = 1
+
+    @classmethod
+    def from_trace_file(cls, path, scalable=None):
+        '''
+        A visualization of a search recorded with trace='binary', which
+        reads the events from the file as it steps through them. Show it
+        with visualize_trace()
+        '''
+        trace = TraceFile(path)
+        visual = cls(trace.rows, trace.cols, trace.startRow, trace.startCol,
+                     scalable)
+        visual.moves = visual.replay = visual.replay_moves = \
+            TraceFileReplay(trace)
+        return visual
+
+    def _replay_events(self, moves):
+        # The process moves are already (row, col, step) events
+        return moves
+
+    def _draw_knight(self):
+        # Restyle the text of the knight's previous square and move the
+        # knight, instead of redrawing the whole board
+        if self.knight_square is not None:
+            x, y = self.knight_square
+            self.texts[x][y].set_color('black')
+            self.texts[x][y].set_position((y + 0.5, x + 0.5))
+        self.knight_square = self.replay.current()
+        if self.knight_square is None:
+            if self.imagebox is not None:
+                self.imagebox.set_visible(False)
+            return
+        x, y = self.knight_square
+        if self.imagebox is None:
+            self.imagebox = AnnotationBbox(OffsetImage(self.piece_img,
+                                                       zoom=0.12),
+                                           (y + 0.5, x + 0.5), frameon=False)
+            self.ax.add_artist(self.imagebox)
+        self.imagebox.xy = self.imagebox.xybox = (y + 0.5, x + 0.5)
+        self.imagebox.set_visible(True)
+        # adjust the style and position of text to match the image
+        self.texts[x][y].set_color('white')
+        self.texts[x][y].set_zorder(10)
+        self.texts[x][y].set_position((y + 0.47, x + 0.66))
+
+    def _start_solver(self, queue_size, history):
+        # The moves are a replay that grows as the events arrive, keeping
+        # the last history of them
+        kt = KnightsTour(self.rows, self.cols, self.start_row, self.start_col,
+                         trace='off')
+        self.solver = BackgroundSolver(kt, queue_size).start()
+        self.moves = self.replay = self.replay_moves = TraceReplay(
+            [], self.rows, self.cols, history=history)
+
+    def _advance(self, count):
+        # Only take the events that are shown, so a search running ahead of
+        # the window waits on the full queue instead of filling memory
+        missing = self.step + count - len(self.moves)
+        if missing > 0 and self.solver is not None:
+            self.moves.extend(self.solver.take(missing))
+            if self.slider is not None:
+                self.slider.valmin = self.moves.first
+                self.slider.valmax = max(self.moves.first + 1,
+                                         len(self.moves))
+                self.slider.ax.set_xlim(self.slider.valmin,
+                                        self.slider.valmax)
+        step = min(self.step + count, len(self.moves))
+        if step != self.step:
+            self.step = step
+            self._update(self.moves)
+
+    def _tick(self):
+        if self.playing:
+            self._advance(self.speed)
+        title = (f'{self.step} of {len(self.moves)} moves, '
+                 f'{self.solver.status}')
+        if title != self.ax.get_title():
+            self.ax.set_title(title)
+            self.fig.canvas.draw_idle()
 
     def _continue_step(self, e):
-        if self.step < len(self.moves):
-            self.step += 1
-        self._update(self.moves)
+        self._advance(1)
+
+    def _play_pause(self, e):
+        self.playing = not self.playing
+        self.bplay.label.set_text('Pause' if self.playing else 'Play')
+
+    def _cancel_search(self, e):
+        self.solver.cancel()
 
-    def visualize_process(self):
-        # Solve the knight's tour and store moves
-        self._store_moves()
+    def _quit_visual(self, e):
+        self._stop()
+        plt.close()
+
+    def _stop(self, e=None):
+        if self.timer is not None:
+            self.timer.stop()
+        if self.solver is not None:
+            self.solver.cancel()
+
+    def visualize_process(self, speed=1, queue_size=4096, history=1 << 16):
+        '''
+        Open the window straight away and play the search as it runs in a
+        background thread, speed moves every 50 ms. At most queue_size
+        moves wait in between; beyond that the search waits for the window.
+        Reverse and the slider reach back over the last history moves
+        shown (at least), older ones are dropped
+        '''
+        self.speed = speed
+        self._start_solver(queue_size, history)
+
+        if self.scalable:
+            self._add_slider()
+
+        # Add continue button
+        axcontinue = plt.axes([0.1, 0.05, 0.15, 0.075])
+        bcontinue = Button(axcontinue, 'Continue')
+        bcontinue.on_clicked(self._continue_step)
+
+        # Add reverse button
+        axreverse = plt.axes([0.27, 0.05, 0.15, 0.075])
+        breverse = Button(axreverse, 'Reverse')
+        breverse.on_clicked(self._reverse_step)
+
+        # Add play and pause button
+        axplay = plt.axes([0.44, 0.05, 0.15, 0.075])
+        self.bplay = Button(axplay, 'Pause')
+        self.bplay.on_clicked(self._play_pause)
+
+        # Add option to stop the search
+        axcancel = plt.axes([0.61, 0.05, 0.15, 0.075])
+        bcancel = Button(axcancel, 'Cancel')
+        bcancel.on_clicked(self._cancel_search)
+
+        # Add option to quit
+        axquit = plt.axes([0.78, 0.05, 0.15, 0.075])
+        bquit = Button(axquit, 'Quit')
+        bquit.on_clicked(self._quit_visual)
+
+        self.fig.canvas.mpl_connect('close_event', self._stop)
+        self.timer = self.fig.canvas.new_timer(interval=50)
+        self.timer.add_callback(self._tick)
+        self.timer.start()
+
+        # Display the animation
+        plt.show()
+
+    def visualize_trace(self):
+        # The search is over, the slider jumps anywhere in its trace
+        self._add_slider()
 
         # Add continue button
         axcontinue = plt.axes([0.25, 0.05, 0.15, 0.075])
@@ -77,7 +181,6 @@ class KTVisualizationProcess(KTVisualization):
         bquit = Button(axquit, 'Quit')
         bquit.on_clicked(self._quit_visual)
 
-        # Display the animation
         plt.show()
 
 
@@ -0,0 +1,254 @@
+from array import array
+import numpy as np
+
+
+class TraceReplay:
+    def __init__(self, moves, rows, cols, keyframe_interval=1024,
+                 history=None):
+        '''
+        The state of the board after any number of events of a move trace,
+        kept up to date one event at a time so that stepping through the
+        trace costs O(1) per step, in either direction
+
+        moves: sequence of (row, col, step) events, a step of -1 marking a
+            backtrack, as recorded by KnightsTour
+        keyframe_interval: int, the number of events between snapshots of
+            the whole board, which bound the cost of a jump to any step
+        history: int, the number of events kept at least. Older events and
+            their keyframes are dropped keyframe_interval at a time, and
+            the replay can no longer seek back to them (default: keep
+            every event)
+
+        Every cell has a number, the step it was last placed at (-1 if
+        never), and a value, its step on the board now (-1 if unvisited).
+        A cell whose number is set but whose value is -1 was backtracked
+        '''
+        self.rows = rows
+        self.cols = cols
+        self.keyframe_interval = keyframe_interval
+        self.history = history
+        # The number of events dropped from the front of the trace; the
+        # first keyframe is the board after them
+        self.first = 0
+        # Per event kept: its cell, the cell's value and number after it,
+        # and the previous event on the same cell (-1 if none)
+        self.cells = array('i')
+        self.values = array('i')
+        self.numbers = array('i')
+        self.previous = array('i')
+        self.number = array('i', [-1]) * (rows * cols)
+        self.value = array('i', [-1]) * (rows * cols)
+        self.keyframes = []
+        self.step = 0
+        # The board after the last event, and the last event on every
+        # cell, for extend()
+        self._end_number = self.number[:]
+        self._end_value = self.value[:]
+        self._last = array('i', [-1]) * (rows * cols)
+        self.extend(moves)
+
+    def extend(self, moves):
+        '''
+        Append events to the trace, for a trace still being recorded. The
+        current step does not move
+        '''
+        number = self._end_number
+        value = self._end_value
+        for row, col, step in moves:
+            index = len(self)
+            if index % self.keyframe_interval == 0:
+                self.keyframes.append((number[:], value[:]))
+            cell = row * self.cols + col
+            self.cells.append(cell)
+            self.values.append(step)
+            self.previous.append(self._last[cell])
+            self._last[cell] = index
+            if step != -1:
+                number[cell] = step
+            self.numbers.append(number[cell])
+            value[cell] = step
+        if self.history is not None:
+            self._trim()
+
+    def _trim(self):
+        # Drop whole keyframe intervals of the oldest events, beyond the
+        # history kept
+        interval = self.keyframe_interval
+        drop = (len(self.cells) - max(self.history, 1)) // interval * interval
+        if drop <= 0:
+            return
+        if self.step < self.first + drop:
+            self.seek(self.first + drop)
+        del self.cells[:drop]
+        del self.values[:drop]
+        del self.numbers[:drop]
+        del self.previous[:drop]
+        del self.keyframes[:drop // interval]
+        self.first += drop
+
+    def __len__(self):
+        return self.first + len(self.cells)
+
+    def _apply(self, index):
+        index -= self.first
+        cell = self.cells[index]
+        self.number[cell] = self.numbers[index]
+        self.value[cell] = self.values[index]
+        return cell
+
+    def _undo(self, index):
+        index -= self.first
+        cell = self.cells[index]
+        before = self.previous[index] - self.first
+        if before < 0:
+            # No event on the cell is kept before this one, so it is as
+            # the first keyframe has it
+            number, value = self.keyframes[0]
+            self.number[cell] = number[cell]
+            self.value[cell] = value[cell]
+        else:
+            self.number[cell] = self.numbers[before]
+            self.value[cell] = self.values[before]
+        return cell
+
+    def seek(self, step):
+        '''
+        Move to the board after the first step events. Returns the flat
+        ids of the cells that changed, or None when the whole board was
+        reloaded from a keyframe. Steps before the events kept (see
+        history) go to the first one kept
+        '''
+        step = max(self.first, min(step, len(self)))
+        if abs(step - self.step) > self.keyframe_interval:
+            keyframe = min((step - self.first) // self.keyframe_interval,
+                           len(self.keyframes) - 1)
+            number, value = self.keyframes[keyframe]
+            self.number[:] = number
+            self.value[:] = value
+            self.step = self.first + keyframe * self.keyframe_interval
+            self._seek_delta(step)
+            return None
+        return self._seek_delta(step)
+
+    def _seek_delta(self, step):
+        changed = set()
+        while self.step < step:
+            changed.add(self._apply(self.step))
+            self.step += 1
+        while self.step > step:
+            self.step -= 1
+            changed.add(self._undo(self.step))
+        return changed
+
+    def current(self):
+        '''
+        The (row, col) of the knight after the current step: the cell of
+        the last event if it placed the knight, otherwise None (also when
+        the last event was dropped, see history)
+        '''
+        index = self.step - 1 - self.first
+        if index < 0 or self.values[index] == -1:
+            return None
+        return divmod(self.cells[index], self.cols)
+
+    def previous_square(self):
+        '''
+        The (row, col) the knight was on before the last event, or None
+        '''
+        index = self.step - 2 - self.first
+        if index < 0:
+            return None
+        return divmod(self.cells[index], self.cols)
+
+    def last_cell(self):
+        '''
+        The flat id of the cell of the last event, or None before the first
+        one (or when it was dropped, see history)
+        '''
+        index = self.step - 1 - self.first
+        return self.cells[index] if index >= 0 else None
+
+
+class TraceFileReplay:
+    # Forward seeks over at most this many events apply them one by one
+    STEP_LIMIT = 4096
+
+    def __init__(self, trace):
+        '''
+        The same state as TraceReplay, over a knightstour_tracefile
+        TraceFile whose events stay on disk. Short forward steps apply the
+        events; any other seek rebuilds the board from the keyframe before
+        the step, so it costs one keyframe replay whatever the length of
+        the trace
+        '''
+        self.trace = trace
+        self.rows = trace.rows
+        self.cols = trace.cols
+        self.cells = _TraceField(trace, 0)
+        self.values = _TraceField(trace, 2)
+        self.number, self.value = trace.stateAt(0)
+        self.step = 0
+
+    def __len__(self):
+        return len(self.trace)
+
+    def seek(self, step):
+        '''
+        Move to the board after the first step events. Returns the flat
+        ids of the cells that changed
+        '''
+        step = max(0, min(step, len(self.trace)))
+        if 0 <= step - self.step <= self.STEP_LIMIT:
+            records = self.trace.records(self.step, step).tolist()
+            changed = set()
+            for cell, value in records:
+                if value != -1:
+                    self.number[cell] = value
+                self.value[cell] = value
+                changed.add(cell)
+        else:
+            number, value = self.trace.stateAt(step)
+            changed = set(np.flatnonzero((number != self.number) |
+                                         (value != self.value)).tolist())
+            self.number, self.value = number, value
+        self.step = step
+        return changed
+
+    def current(self):
+        '''
+        The (row, col) of the knight after the current step: the cell of
+        the last event if it placed the knight, otherwise None
+        '''
+        if self.step == 0:
+            return None
+        row, col, value = self.trace[self.step - 1]
+        return None if value == -1 else (row, col)
+
+    def previous_square(self):
+        '''
+        The (row, col) the knight was on before the last event, or None
+        '''
+        if self.step < 2:
+            return None
+        return self.trace[self.step - 2][:2]
+
+    def last_cell(self):
+        '''
+        The flat id of the cell of the last event, or None before the first
+        one
+        '''
+        if self.step == 0:
+            return None
+        return self.cells[self.step - 1]
+
+
+class _TraceField:
+    # One field of the events of a TraceFile, as TraceReplay.cells and
+    # TraceReplay.values hold them
+    def __init__(self, trace, field):
+        self.trace = trace
+        self.field = field
+
+    def __getitem__(self, index):
+        row, col, value = self.trace[index]
+        return row * self.trace.cols + col if self.field == 0 else value
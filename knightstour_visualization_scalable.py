@@ -0,0 +1,138 @@
+import numpy as np
+from matplotlib.collections import LineCollection
+from matplotlib.colors import ListedColormap, to_rgb
+
+
+BROWN = '#b08974'
+BEIGE = '#ede7df'
+RED = '#db382a'
+
+
+class ScalableBoard:
+    # Squares are numbered only when at most this many rows and columns
+    # are in view
+    LABEL_LIMIT = 24
+
+    def __init__(self, ax, rows, cols, piece_img):
+        '''
+        Draw a board of any size with a fixed number of artists: the
+        squares as one image, the backtracked squares as a second image on
+        top, the knight's path as one LineCollection and the knight as a
+        third image. The squares are only numbered when zoomed in, with a
+        small pool of Text artists reused for the squares in view
+
+        ax: the matplotlib axes to draw on
+        piece_img: the image of the knight
+        '''
+        self.ax = ax
+        self.rows = rows
+        self.cols = cols
+        extent = (0, cols, rows, 0)
+
+        ax.set_xticks([])
+        ax.set_yticks([])
+        checker = np.indices((rows, cols)).sum(axis=0) % 2
+        ax.imshow(checker, cmap=ListedColormap([BROWN, BEIGE]),
+                  extent=extent, interpolation='nearest', zorder=0)
+        # The backtracked squares, red where the alpha channel is set
+        self.crossed = np.zeros((rows, cols, 4), dtype=np.uint8)
+        self.crossed[:, :, :3] = [round(255 * c) for c in to_rgb(RED)]
+        self.crossed_image = ax.imshow(self.crossed, extent=extent,
+                                       interpolation='nearest', zorder=1)
+        self.path = LineCollection([], colors='black', zorder=2,
+                                   linewidths=max(0.5, min(2, 100 / max(
+                                       rows, cols))))
+        ax.add_collection(self.path)
+        self.knight = ax.imshow(piece_img, extent=(0, 1, 1, 0), zorder=3)
+        self.knight.set_visible(False)
+        ax.set_xlim(0, cols)
+        ax.set_ylim(rows, 0)
+
+        # The centre of the square on the path at every step, kept up to
+        # date from the squares that change, so the path is a prefix
+        self.points = np.zeros((rows * cols, 2))
+        self.centres = np.stack(np.indices((rows, cols))[::-1], axis=-1) \
+            .reshape(-1, 2) + 0.5
+        self.labels = []
+        self.replay = None
+        ax.callbacks.connect('xlim_changed', self._on_zoom)
+        ax.callbacks.connect('ylim_changed', self._on_zoom)
+
+    def draw(self, replay, changed):
+        '''
+        Show the board at the current step of replay, after seek() reported
+        the changed cells (None: all of them)
+        '''
+        self.replay = replay
+        if changed is None:
+            # The whole board, at once
+            value = np.frombuffer(replay.value, dtype=np.int32)
+            number = np.frombuffer(replay.number, dtype=np.int32)
+            placed = value != -1
+            self.points[value[placed]] = self.centres[placed]
+            self.crossed[:, :, 3] = np.where(
+                (number != -1) & ~placed, 153, 0).reshape(self.rows, self.cols)
+            changed = ()
+        for cell in changed:
+            x, y = divmod(cell, self.cols)
+            value = replay.value[cell]
+            if value != -1:
+                self.points[value] = (y + 0.5, x + 0.5)
+            crossed = replay.number[cell] != -1 and value == -1
+            self.crossed[x, y, 3] = 153 if crossed else 0
+        self.crossed_image.set_data(self.crossed)
+
+        # The path is as deep as the last event left it: one past the step
+        # it placed, or the step it took back
+        depth = 0
+        last = replay.last_cell()
+        if last is not None:
+            depth = replay.number[last] + (replay.value[last] != -1)
+        self.path.set_segments([self.points[:depth]])
+
+        current = replay.current()
+        if current is not None:
+            x, y = current
+            self.knight.set_extent((y + 0.1, y + 0.9, x + 0.9, x + 0.1))
+        self.knight.set_visible(current is not None)
+        self._draw_labels()
+
+    def _on_zoom(self, ax):
+        if self.replay is not None:
+            self._draw_labels()
+
+    def _draw_labels(self):
+        (left, right), (bottom, top) = self.ax.get_xlim(), self.ax.get_ylim()
+        col_range = range(max(0, int(np.floor(min(left, right)))),
+                          min(self.cols, int(np.ceil(max(left, right)))))
+        row_range = range(max(0, int(np.floor(min(bottom, top)))),
+                          min(self.rows, int(np.ceil(max(bottom, top)))))
+        used = 0
+        if (len(col_range) <= self.LABEL_LIMIT
+                and len(row_range) <= self.LABEL_LIMIT):
+            # Size the numbers to the squares in view
+            height = (self.ax.get_window_extent().height * 72
+                      / self.ax.figure.dpi)
+            fontsize = 0.3 * height / max(abs(top - bottom), 1)
+            current = self.replay.current()
+            for x in row_range:
+                for y in col_range:
+                    number = self.replay.number[x * self.cols + y]
+                    if number == -1:
+                        continue
+                    if used == len(self.labels):
+                        self.labels.append(self.ax.text(
+                            0, 0, '', ha='center', va='center', zorder=4,
+                            weight='bold', clip_on=True))
+                    label = self.labels[used]
+                    text = str(number)
+                    label.set_text(text)
+                    label.set_position((y + 0.5, x + 0.5))
+                    # Long numbers get smaller to fit in the square
+                    label.set_fontsize(fontsize * min(1, 3 / len(text)))
+                    # The number of the knight's square goes on the knight
+                    label.set_color('white' if (x, y) == current else 'black')
+                    label.set_visible(True)
+                    used += 1
+        for label in self.labels[used:]:
+            label.set_visible(False)
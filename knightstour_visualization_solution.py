@@ -1,11 +1,13 @@
 import numpy as np
 import matplotlib.pyplot as plt
-from matplotlib.widgets import Button
+from matplotlib.widgets import Button, Slider
 from knightstour import KnightsTour
 import matplotlib.image as mpimg
 import tkinter as tk
 from tkinter import messagebox
 from matplotlib.animation import FuncAnimation
+from knightstour_visualization_replay import TraceReplay
+from knightstour_visualization_scalable import ScalableBoard
 
 
 class InputDialog:
@@ -18,22 +20,22 @@ class InputDialog:
         # Row input
         tk.Label(self.window, text="Number of rows:").pack(pady=5)
         # default to 3x4 board
-        self.row_spinbox = tk.Spinbox(self.window, from_=1, to=8, width=5, value=3)
+        self.row_spinbox = tk.Spinbox(self.window, from_=1, to=200, width=5, value=3)
         self.row_spinbox.pack(pady=5)
 
         # Column input
         tk.Label(self.window, text="Number of columns:").pack(pady=5)
-        self.col_spinbox = tk.Spinbox(self.window, from_=1, to=8, width=5, value=4)
+        self.col_spinbox = tk.Spinbox(self.window, from_=1, to=200, width=5, value=4)
         self.col_spinbox.pack(pady=5)
 
         # Starting row input
         tk.Label(self.window, text="Starting row (0-indexed):").pack(pady=5)
-        self.start_row_spinbox = tk.Spinbox(self.window, from_=0, to=8, width=5)
+        self.start_row_spinbox = tk.Spinbox(self.window, from_=0, to=199, width=5)
         self.start_row_spinbox.pack(pady=5)
 
         # Starting column input
         tk.Label(self.window, text="Starting column (0-indexed):").pack(pady=5)
-        self.start_col_spinbox = tk.Spinbox(self.window, from_=0, to=8, width=5)
+        self.start_col_spinbox = tk.Spinbox(self.window, from_=0, to=199, width=5)
         self.start_col_spinbox.pack(pady=5)
 
         # Confirm button
@@ -70,7 +72,12 @@ class InputDialog:
 
 
 class KTVisualization:
-    def __init__(self, rows, cols, start_row, start_col):
+    def __init__(self, rows, cols, start_row, start_col, scalable=None):
+        '''
+        scalable: bool, draw the board with a fixed number of artists
+            (see ScalableBoard) instead of a few per square; by default
+            only on boards larger than 8x8
+        '''
         self.CHESS_PIECE_IMG = 'knight.png'
         self.BROWN = '#b08974'
         self.BEIGE = '#ede7df'
@@ -87,8 +94,21 @@ class KTVisualization:
         self.remove_symbols = None
         self.imagebox = None
         self.moves = None
-
-        self._init_board()
+        self.status = None
+        # Load the chess piece image once, every step reuses it
+        self.piece_img = mpimg.imread(self.CHESS_PIECE_IMG)
+        # The board state at the current step, see _get_replay
+        self.replay = None
+        self.replay_moves = None
+        self.animation = None
+        self.slider = None
+        self.scalable = max(rows, cols) > 8 if scalable is None else scalable
+        self.board = None
+
+        if self.scalable:
+            self.board = ScalableBoard(self.ax, rows, cols, self.piece_img)
+        else:
+            self._init_board()
 
     def _init_board(self):
         self.ax.set_xlim(0, self.cols)
@@ -166,33 +186,58 @@ class KTVisualization:
             for i in range(self.rows)
         ]
 
-    def _update(self, moves):
-        self.chessboard.fill(-1)
-        # Remove the existing imagebox if it exists
-        for artist in self.ax.artists:
-            artist.remove()
+    def _replay_events(self, moves):
+        # The solution moves are squares in step order
+        return [(x, y, pos) for pos, (x, y) in enumerate(moves)]
+
+    def _get_replay(self, moves):
+        if self.replay is None or self.replay_moves is not moves:
+            self.replay = TraceReplay(self._replay_events(moves),
+                                      self.rows, self.cols)
+            self.replay_moves = moves
+        return self.replay
+
+    def _draw_cell(self, x, y):
+        # Show the number of the cell, crossed out if it was backtracked
+        number = self.replay.number[x * self.cols + y]
+        value = self.replay.value[x * self.cols + y]
+        self.chessboard[x, y] = value
+        self.texts[x][y].set_text(str(number) if number != -1 else '')
+        if number != -1 and value == -1:
+            self.remove_symbols[x][y].set_text('x')
+            self.remove_symbols[x][y].set_zorder(10)
+        else:
+            self.remove_symbols[x][y].set_text('')
 
-        for i in range(self.rows):
-            for j in range(self.cols):
-                self.texts[i][j].set_text('')
-
-        for pos, (x, y) in enumerate(moves[:self.step]):
-            # Show the chess piece
-            if pos != -1:
-                self.chessboard[x, y] = pos
-                self.texts[x][y].set_text(str(pos))
-                self.remove_symbols[x][y].set_text('')
-                if pos == self.step - 1:
-                    start_pos = moves[self.step - 2] if self.step > 1 else (self.start_row, self.start_col)
-                    self._show_motion(start_pos, (x, y))
-                else:
-                    # Reset the style and position of text
-                    self.texts[x][y].set_color('black')
-                    self.texts[x][y].set_position((y + 0.5, x + 0.5))
-            else:
-                self.chessboard[x, y] = -1
-                self.remove_symbols[x][y].set_text('x')
-                self.remove_symbols[x][y].set_zorder(10)
+    def _draw_knight(self):
+        current = self.replay.current()
+        if current is None:
+            if self.imagebox is not None:
+                self.imagebox.set_visible(False)
+            return
+        start_pos = self.replay.previous_square() or (self.start_row,
+                                                      self.start_col)
+        self._show_motion(start_pos, current)
+
+    def _update(self, moves):
+        # Only redraw the cells that changed since the last step
+        replay = self._get_replay(moves)
+        changed = replay.seek(self.step)
+        # The replay may not reach back to the step asked for
+        self.step = replay.step
+        if self.slider is not None and self.slider.val != self.step:
+            self.slider.eventson = False
+            self.slider.set_val(self.step)
+            self.slider.eventson = True
+        if self.board is not None:
+            self.board.draw(replay, changed)
+            self.fig.canvas.draw_idle()
+            return
+        if changed is None:
+            changed = range(self.rows * self.cols)
+        for cell in changed:
+            self._draw_cell(*divmod(cell, self.cols))
+        self._draw_knight()
         self.fig.canvas.draw_idle()
 
     def _continue_step(self, e):
@@ -211,22 +256,38 @@ class KTVisualization:
         self.step = 0
         self._update(self.moves)
 
+    def _slide_step(self, value):
+        self.step = int(value)
+        self._update(self.moves)
+
+    def _add_slider(self):
+        # Jump to any step of a long tour
+        plt.subplots_adjust(bottom=0.2)
+        axstep = plt.axes([0.25, 0.14, 0.55, 0.03])
+        self.slider = Slider(axstep, 'Step', 0, max(1, len(self.moves)),
+                             valinit=self.step, valstep=1)
+        self.slider.on_changed(self._slide_step)
+
     def _quit_visual(self, e):
         plt.close()
 
     def _store_moves(self):
-        kt = KnightsTour(self.rows, self.cols, self.start_row, self.start_col)
-        solution_board = kt.solve()
-        if solution_board is not None:
-            self.moves = [(0, 0) for _ in range(self.rows * self.cols)]
-            for i in range(self.rows):
-                for j in range(self.cols):
-                    self.moves[solution_board[i][j]] = (i, j)
+        # Backtracking takes too long beyond 8x8, Warnsdorff's rule does not
+        strategy = 'warnsdorff' if self.scalable else 'backtrack'
+        kt = KnightsTour(self.rows, self.cols, self.start_row, self.start_col,
+                         strategy=strategy)
+        if kt.solve() is not None:
+            # The squares in step order, read straight off the solver's board
+            order = np.argsort(kt.getBoard('numpy'), axis=None)
+            self.moves = [divmod(cell, self.cols) for cell in order.tolist()]
+        self.status = kt.status
 
     def _show_motion(self, start_pos, end_pos):
-        # Load the checker piece image
-        checker_img = mpimg.imread(self.CHESS_PIECE_IMG)
-        imagebox = self.ax.imshow(checker_img, extent=[0, 1, 0, 1], origin='lower')
+        # Reuse the chess piece artist from the previous step
+        if self.imagebox is None:
+            self.imagebox = self.ax.imshow(self.piece_img, extent=[0, 1, 0, 1], origin='lower')
+        imagebox = self.imagebox
+        imagebox.set_visible(True)
 
         # Animation function
         def animate(frame):
@@ -241,7 +302,7 @@ class KTVisualization:
         frames = list(zip(x_coords, y_coords))
 
         # Create the animation
-        ani = FuncAnimation(self.fig, animate, frames=frames, interval=3, blit=True, repeat=False)
+        self.animation = FuncAnimation(self.fig, animate, frames=frames, interval=3, blit=True, repeat=False)
 
         plt.show()
 
@@ -249,12 +310,21 @@ class KTVisualization:
         # Solve the knight's tour and store moves
         self._store_moves()
         if self.moves is None:
-            messagebox.showerror(
-                "No Solution",
-                "No solution found for the given board."
-            )
+            if self.status == 'gave up':
+                messagebox.showerror(
+                    "No Solution",
+                    "The search gave up before finding a tour of the given board."
+                )
+            else:
+                messagebox.showerror(
+                    "No Solution",
+                    "No solution found for the given board."
+                )
             return
 
+        if self.scalable:
+            self._add_slider()
+
         # Add continue button
         axcontinue = plt.axes([0.25, 0.05, 0.15, 0.075])
         bcontinue = Button(axcontinue, 'Continue')
@@ -1,27 +1,63 @@
-import time
 import matplotlib.pyplot as plt
+from benchmark import run_case
 from knightstour import KnightsTour
 
 
-def time_analysis(board_sizes):
+def time_analysis(board_sizes, prune=False, repeats=3):
+    # The median of repeats runs per size, see benchmark.py for the full
+    # harness (start square sweeps, JSON output, baseline comparison)
     times = []
 
     for size in board_sizes:
         rows, cols = size
-        kt = KnightsTour(rows, cols, 0, 0)
+        result = run_case(rows, cols, 0, 0, repeats=repeats, warmup=0,
+                          prune=prune)
 
-        start_time = time.time()
-        kt.solve()
-        end_time = time.time()
-
-        elapsed_time = end_time - start_time
+        elapsed_time = result['median_ns'] / 1e9
         times.append(elapsed_time)
 
-        print(f"Board size {rows}x{cols}: {elapsed_time:.4f} seconds")
+        print(f"Board size {rows}x{cols}: {elapsed_time:.4f} seconds "
+              f"(IQR {result['iqr_ns'] / 1e9:.4f})")
+        if prune:
+            print(f"    {result['pruned_nodes']} nodes pruned")
 
     return times
 
 
+def node_analysis(board_sizes, prune=False):
+    # The shape of each search: how many nodes it expanded and at which
+    # depths it backtracked, to tell a big search tree from a slow one
+    stats = []
+
+    for rows, cols in board_sizes:
+        kt = KnightsTour(rows, cols, 0, 0, prune=prune, trace='off',
+                         instrument=True)
+        kt.solve()
+        stats.append(kt.getStats())
+
+        print(f"Board size {rows}x{cols}: {stats[-1]['nodes']} nodes, "
+              f"{stats[-1]['backtracks']} backtracks, "
+              f"max depth {stats[-1]['maxDepth']}")
+
+    return stats
+
+
+def plot_nodes(board_sizes, times, stats):
+    # Nodes against time: boards on one line spend the same time per node,
+    # so a slow board off the line is slow per node, not for its tree size
+    plt.figure(figsize=(10, 6))
+    nodes = [max(stat['nodes'], 1) for stat in stats]
+    plt.loglog(nodes, times, marker='o', linestyle='')
+    for (rows, cols), x, y in zip(board_sizes, nodes, times):
+        plt.annotate(f"{rows}x{cols}", (x, y))
+    plt.xlabel('Nodes expanded')
+    plt.ylabel('Time (seconds)')
+    plt.title('Knight\'s Tour Nodes against Time')
+    plt.grid(True)
+    plt.savefig('time_analysis_nodes.png')
+    plt.show()
+
+
 def plot_results(board_sizes, times):
     sizes = [f"{rows}x{cols}" for rows, cols in board_sizes]
 
@@ -55,3 +91,7 @@ if __name__ == "__main__":
     # Plot the results and save the data
     plot_results(board_sizes, times)
     save_results(board_sizes, times)
+
+    # Attribute the times to the size of the search trees
+    stats = node_analysis(board_sizes)
+    plot_nodes(board_sizes, times, stats)